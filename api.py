@@ -0,0 +1,258 @@
+"""
+In-process API for the commands in project.py.
+
+    client = api.Client()                  # connections from project.connect_db()
+    client = api.Client(conn=connection)   # or an injected connection (left open)
+    client = api.Client(pool=pool)         # or any pool with get_connection()
+
+    rows = client.popular_release(10)      # [PopularReleaseRow(rid=..., title=..., review_count=...), ...]
+    client.add_genre(7, "drama")           # raises Duplicate / NotFound / CommandFailed instead of printing Fail
+
+Hot statements go through Client.execute, which uses server-side prepared statements when
+project.use_statement_registry() is on (repl and batch mode).
+
+Query methods return a list of rows from rows.py, or with stream=True an iterator over lists of rows,
+read STREAM_CHUNK_SIZE at a time. Write methods return None and raise CommandFailed when the CLI prints Fail.
+The CLI functions in project.py format these results.
+"""
+from contextlib import contextmanager
+
+import project
+from rows import ReleaseRow, PopularReleaseRow, ReleaseTitleRow, ActiveViewerRow, VideoViewRow
+
+ER_DUP_ENTRY = 1062
+ER_NO_REFERENCED_ROW_2 = 1452
+
+class CommandFailed(Exception):
+    """
+    The command could not be carried out; the message is the driver error when there was one.
+    """
+
+class NotFound(CommandFailed):
+    pass
+
+class Duplicate(CommandFailed):
+    pass
+
+class Client:
+    def __init__(self, conn=None, pool=None):
+        project.load_driver()
+        self.conn = conn
+        self.pool = pool
+        self.transaction_conn = None
+
+    @contextmanager
+    def connection(self):
+        if self.conn is not None:
+            yield self.conn
+            return
+        conn = self.pool.get_connection() if self.pool is not None else project.connect_db()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Yields a cursor and commits when the block finishes; any failure rolls back and surfaces as CommandFailed.
+        """
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            self.transaction_conn = conn
+            try:
+                yield cursor
+                conn.commit()
+            except project.mysql.connector.Error as err:
+                conn.rollback()
+                raise CommandFailed(str(err)) from err
+            except CommandFailed:
+                conn.rollback()
+                raise
+            finally:
+                self.transaction_conn = None
+                cursor.close()
+
+    def ensure_rollups(self):
+        """
+        Builds the rollup tables on a database imported before they existed (see project.ensure_rollups).
+        """
+        if not project.rollups_ready:
+            with self.transaction() as cursor:
+                project.ensure_rollups(cursor)
+
+    def execute(self, cursor, sql, params):
+        """
+        cursor.execute inside transaction(), or the prepared statement for sql when the registry is on.
+        Returns the cursor that ran it.
+        """
+        return project.execute_statement(self.transaction_conn, cursor, sql, params)
+
+    def query(self, row_type, sql, params, stream=False, prepared=False):
+        chunks = self.iter_chunks(row_type, sql, params, prepared=prepared)
+        if stream:
+            return chunks
+        return [row for chunk in chunks for row in chunk]
+
+    def iter_chunks(self, row_type, sql, params, chunk_size=project.STREAM_CHUNK_SIZE, prepared=False):
+        """
+        With prepared, a fixed SQL string runs as a registry prepared statement; the registry keeps that cursor,
+        so it is drained rather than closed.
+        """
+        with self.connection() as conn:
+            prepared = prepared and project.statement_registry is not None
+            cursor = None if prepared else conn.cursor()
+            try:
+                cursor = project.execute_statement(conn, cursor, sql, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        return
+                    yield [row_type(*row) for row in rows]
+            except project.mysql.connector.Error as err:
+                raise CommandFailed(str(err)) from err
+            finally:
+                if not prepared:
+                    cursor.close()
+                elif cursor is not None:
+                    try:
+                        cursor.fetchall()
+                    except project.mysql.connector.Error:
+                        pass
+
+    def insert_viewer(self, uid, email, nickname, street, city, state, zip_code, genres, joined_date,
+                      first_name, last_name, subscription):
+        with self.transaction() as cursor:
+            self.execute(cursor, project.INSERT_USER_SQL,
+                         (uid, email, joined_date, nickname, street, city, state, zip_code, genres))
+            self.execute(cursor, project.INSERT_VIEWER_SQL, (uid, subscription, first_name, last_name))
+            if project.genre_table_enabled(cursor):
+                self.execute(cursor, project.SYNC_ONE_USER_GENRES_SQL, (uid,))
+
+    def add_genre(self, uid, genre):
+        """
+        Raises NotFound for an unknown uid and Duplicate when the user already has the genre (case-insensitive).
+        """
+        with self.transaction() as cursor:
+            if project.genre_table_enabled(cursor):
+                try:
+                    project.add_genre_normalized(cursor, uid, genre, self.transaction_conn)
+                except project.mysql.connector.IntegrityError as err:
+                    if err.errno == ER_NO_REFERENCED_ROW_2:
+                        raise NotFound(f"no user {uid}") from err
+                    raise Duplicate(f"user {uid} already has genre {genre}") from err
+                return
+            # fetchall so that a prepared cursor has no unread result left when the UPDATE runs.
+            rows = self.execute(cursor, project.USER_GENRES_SQL, (uid,)).fetchall()
+            result = rows[0] if rows else None
+            if result is None:
+                raise NotFound(f"no user {uid}")
+            current_genres = result[0]
+            if current_genres:
+                genres_list = [g.strip() for g in current_genres.split(';')]
+                if genre.lower() in [g.lower() for g in genres_list]:
+                    raise Duplicate(f"user {uid} already has genre {genre}")
+                updated_genres = current_genres + ";" + genre
+            else:
+                updated_genres = genre
+            self.execute(cursor, project.SET_USER_GENRES_SQL, (updated_genres, uid))
+
+    def delete_viewer(self, uid):
+        self.ensure_rollups()
+        with self.transaction() as cursor:
+            cursor.execute(project.REMOVE_VIEWER_REVIEW_STATS_SQL, (uid,))
+            # Partitioned sessions has no foreign key to cascade from viewers.
+            cursor.execute("DELETE FROM sessions WHERE uid = %s", (uid,))
+            cursor.execute("DELETE FROM viewers WHERE uid = %s", (uid,))
+            cursor.execute("DELETE FROM users WHERE uid = %s", (uid,))
+
+    def delete_viewers(self, uids, batch_size=project.DEFAULT_PURGE_BATCH_SIZE, pause=0, progress=None):
+        """
+        Deletes many viewers without holding locks on all their rows at once. For every PURGE_UID_GROUP uids,
+        their sessions, daily session counts and reviews are deleted in transactions of at most batch_size rows
+        (release_stats is decremented with each batch of reviews), then the viewers and users rows go in one
+        short transaction, together with whatever sessions and reviews live writes added since the batches.
+        Sleeps pause seconds after every transaction so that live writes get the locks in between, and calls
+        progress(viewers done, deleted) after each group. Returns deleted, {table: rows}.
+        """
+        import time
+        from collections import Counter
+        self.ensure_rollups()
+        uids = list(uids)
+        deleted = {"sessions": 0, "viewer_daily_sessions": 0, "reviews": 0, "viewers": 0}
+        for offset in range(0, len(uids), project.PURGE_UID_GROUP):
+            group = uids[offset:offset + project.PURGE_UID_GROUP]
+            placeholders = ", ".join(["%s"] * len(group))
+            for table in ("sessions", "viewer_daily_sessions"):
+                removed = batch_size
+                while removed >= batch_size:
+                    with self.transaction() as cursor:
+                        cursor.execute(f"DELETE FROM {table} WHERE uid IN ({placeholders}) LIMIT %s",
+                                       (*group, batch_size))
+                        removed = cursor.rowcount
+                    deleted[table] += removed
+                    time.sleep(pause)
+            removed = batch_size
+            while removed >= batch_size:
+                with self.transaction() as cursor:
+                    cursor.execute(f"SELECT rvid, rid FROM reviews WHERE uid IN ({placeholders}) LIMIT %s FOR UPDATE",
+                                   (*group, batch_size))
+                    reviews = cursor.fetchall()
+                    removed = len(reviews)
+                    if reviews:
+                        review_counts = Counter(rid for _, rid in reviews if rid is not None)
+                        cursor.executemany("UPDATE release_stats SET review_count = review_count - %s WHERE rid = %s",
+                                           [(count, rid) for rid, count in review_counts.items()])
+                        cursor.execute(f"DELETE FROM reviews WHERE rvid IN ({', '.join(['%s'] * removed)})",
+                                       [rvid for rvid, _ in reviews])
+                deleted["reviews"] += removed
+                time.sleep(pause)
+            with self.transaction() as cursor:
+                # Catches reviews written since the batches above.
+                cursor.executemany(project.REMOVE_VIEWER_REVIEW_STATS_SQL, [(uid,) for uid in group])
+                # Partitioned sessions has no foreign key to cascade from viewers.
+                cursor.execute(f"DELETE FROM sessions WHERE uid IN ({placeholders})", group)
+                cursor.execute(f"DELETE FROM viewers WHERE uid IN ({placeholders})", group)
+                deleted["viewers"] += cursor.rowcount
+                cursor.execute(f"DELETE FROM users WHERE uid IN ({placeholders})", group)
+            time.sleep(pause)
+            if progress is not None:
+                progress(offset + len(group), deleted)
+        return deleted
+
+    def insert_movie(self, rid, website_url):
+        with self.transaction() as cursor:
+            cursor.execute(project.INSERT_MOVIE_SQL, (rid, website_url))
+
+    def insert_session(self, sid, uid, rid, ep_num, initiate_at, leave_at, quality, device):
+        self.ensure_rollups()
+        with self.transaction() as cursor:
+            self.execute(cursor, project.INSERT_SESSION_SQL,
+                         (sid, uid, rid, ep_num, initiate_at, leave_at, quality, device))
+            self.execute(cursor, project.COUNT_DAILY_SESSION_SQL, (initiate_at, uid))
+
+    def update_release(self, rid, title):
+        with self.transaction() as cursor:
+            cursor.execute("UPDATE releases SET title = %s WHERE rid = %s", (title, rid))
+
+    def list_releases(self, uid, stream=False):
+        return self.query(ReleaseRow, project.LIST_RELEASES_SQL, (uid,), stream)
+
+    def popular_release(self, n, stream=False):
+        self.ensure_rollups()
+        return self.query(PopularReleaseRow, project.POPULAR_RELEASE_SQL, (n,), stream)
+
+    def release_title(self, sid, stream=False):
+        return self.query(ReleaseTitleRow, project.RELEASE_TITLE_SQL, (sid,), stream, prepared=True)
+
+    def active_viewer(self, minimum_sessions, start_date, end_date, stream=False):
+        self.ensure_rollups()
+        sql, params = project.active_viewer_query(minimum_sessions, start_date, end_date)
+        return self.query(ActiveViewerRow, sql, params, stream)
+
+    def videos_viewed(self, rid, stream=False):
+        return self.query(VideoViewRow, project.VIDEOS_VIEWED_SQL, (rid, rid), stream)
+
+    def videos_viewed_many(self, rids=None, rid_range=None, stream=False):
+        sql, params = project.videos_viewed_many_query(rids, rid_range)
+        return self.query(VideoViewRow, sql, params, stream)
@@ -0,0 +1,115 @@
+"""
+asyncio versions of the query commands in project.py for services that run many lookups at once.
+
+    pool = await async_engine.create_pool(size=50)
+    rows = await async_engine.release_title(pool, sid)
+    await pool.close()
+
+Each function borrows one connection from the pool, runs the same SQL as the CLI command and returns a list of
+typed rows from rows.py; driver errors propagate instead of printing Fail. The pool is backed by
+mysql.connector.aio unless a different connect coroutine is passed in, e.g. a stand-in for tests.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import project
+from rows import ReleaseRow, PopularReleaseRow, ReleaseTitleRow, ActiveViewerRow, VideoViewRow
+
+DEFAULT_ASYNC_POOL_SIZE = 20
+
+async def close_quietly(conn):
+    try:
+        await conn.close()
+    except Exception:
+        pass
+
+class AsyncPool:
+    """
+    Opens up to size connections on demand and hands idle ones back out; callers wait when all are busy.
+    A connection that was in use when an exception escaped is closed rather than reused, and its slot goes to
+    the next waiter, which opens a new one. Connections returned after close() are closed too.
+    """
+
+    def __init__(self, connect, size=DEFAULT_ASYNC_POOL_SIZE):
+        self.connect = connect
+        self.size = size
+        self.slots = asyncio.Semaphore(size)
+        self.idle = []
+        self.closed = False
+
+    async def acquire(self):
+        await self.slots.acquire()
+        if self.idle:
+            return self.idle.pop()
+        try:
+            return await self.connect()
+        except BaseException:
+            self.slots.release()
+            raise
+
+    async def release(self, conn):
+        if self.closed:
+            await self.discard(conn)
+            return
+        self.idle.append(conn)
+        self.slots.release()
+
+    async def discard(self, conn):
+        self.slots.release()
+        await close_quietly(conn)
+
+    @asynccontextmanager
+    async def connection(self):
+        conn = await self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            await self.discard(conn)
+            raise
+        await self.release(conn)
+
+    async def close(self):
+        self.closed = True
+        while self.idle:
+            await close_quietly(self.idle.pop())
+
+async def connect_async():
+    """
+    One mysql.connector.aio connection with the CLI's credentials. Autocommit keeps every lookup on a fresh
+    snapshot, since pooled connections otherwise hold their first read view open.
+    """
+    import mysql.connector.aio
+    config = {key: value for key, value in project.DB_CONFIG.items() if key != "use_pure"}
+    return await mysql.connector.aio.connect(**config, autocommit=True)
+
+async def create_pool(size=DEFAULT_ASYNC_POOL_SIZE, connect=connect_async):
+    return AsyncPool(connect, size)
+
+async def fetch_rows(pool, row_type, sql, params):
+    async with pool.connection() as conn:
+        cursor = await conn.cursor()
+        try:
+            await cursor.execute(sql, params)
+            return [row_type(*row) for row in await cursor.fetchall()]
+        finally:
+            await cursor.close()
+
+async def list_releases(pool, uid):
+    return await fetch_rows(pool, ReleaseRow, project.LIST_RELEASES_SQL, (uid,))
+
+async def popular_release(pool, n):
+    return await fetch_rows(pool, PopularReleaseRow, project.POPULAR_RELEASE_SQL, (n,))
+
+async def release_title(pool, sid):
+    return await fetch_rows(pool, ReleaseTitleRow, project.RELEASE_TITLE_SQL, (sid,))
+
+async def active_viewer(pool, minimum_sessions, start_date, end_date):
+    sql, params = project.active_viewer_query(minimum_sessions, start_date, end_date)
+    return await fetch_rows(pool, ActiveViewerRow, sql, params)
+
+async def videos_viewed(pool, rid):
+    return await fetch_rows(pool, VideoViewRow, project.VIDEOS_VIEWED_SQL, (rid, rid))
+
+async def videos_viewed_many(pool, rids=None, rid_range=None):
+    sql, params = project.videos_viewed_many_query(rids, rid_range)
+    return await fetch_rows(pool, VideoViewRow, sql, params)
@@ -0,0 +1,270 @@
+"""
+Synthetic data generator and latency benchmark for the commands in project.py.
+
+    python benchmark.py generate <folder> [--sessions N] [--seed S]
+    python benchmark.py run <folder> [--iterations N] [--pool] [--output results.json]
+    python benchmark.py startup [--runs N] [--budget-ms MS]
+
+generate writes the nine {table}.csv files in import_data's format plus a manifest.json with the row counts.
+run imports the folder into the local cs122a database, times every query and write command and prints
+p50/p95/p99 latency and throughput as JSON.
+startup times bare CLI calls that stop before the MySQL driver is loaded and exits non-zero when their
+p50 exceeds the startup budget; run reports the same numbers.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+import project
+
+GENRES = ["action", "comedy", "drama", "horror", "romance", "sci-fi", "documentary", "animation", "thriller"]
+SUBSCRIPTIONS = ["free", "monthly", "yearly"]
+QUALITIES = ["480p", "720p", "1080p", "4k"]
+DEVICES = ["mobile", "desktop", "tv", "tablet"]
+STATES = ["CA", "NY", "TX", "WA", "IL", "FL"]
+EPOCH = datetime(2023, 1, 1)
+SPAN_SECONDS = 2 * 365 * 24 * 3600
+WRITE_CHUNK = 10000
+STARTUP_BUDGET_MS = 60
+
+def scale_for(sessions):
+    """
+    Row counts for every table, derived from the number of sessions.
+    """
+    viewers = max(100, sessions // 50)
+    producers = max(10, sessions // 20000)
+    releases = max(20, sessions // 2000)
+    return {
+        "sessions": sessions,
+        "viewers": viewers,
+        "producers": producers,
+        "users": viewers + producers,
+        "releases": releases,
+        "reviews": max(50, sessions // 10),
+    }
+
+def zipf_weights(n, exponent=1.1):
+    """
+    Cumulative Zipf weights, so a few releases and viewers get most of the traffic.
+    """
+    return list(accumulate(1.0 / (rank ** exponent) for rank in range(1, n + 1)))
+
+def timestamp(rng):
+    return EPOCH + timedelta(seconds=rng.randrange(SPAN_SECONDS))
+
+def write_table(folder, table, header, rows):
+    with open(os.path.join(folder, f"{table}.csv"), 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+def skewed_ids(rng, population, cum_weights, count):
+    """
+    Yields count ids drawn from population with Zipf skew, WRITE_CHUNK draws at a time.
+    """
+    while count > 0:
+        batch = min(count, WRITE_CHUNK)
+        yield from rng.choices(population, cum_weights=cum_weights, k=batch)
+        count -= batch
+
+def generate(folder, sessions, seed=122):
+    rng = random.Random(seed)
+    scale = scale_for(sessions)
+    os.makedirs(folder, exist_ok=True)
+    viewer_ids = range(1, scale["viewers"] + 1)
+    producer_ids = range(scale["viewers"] + 1, scale["users"] + 1)
+    release_ids = range(1, scale["releases"] + 1)
+
+    write_table(folder, "users",
+                ["uid", "email", "joined_date", "nickname", "street", "city", "state", "zip", "genres"],
+                ((uid, f"user{uid}@example.com", timestamp(rng).date(), f"nick{uid}", f"{uid} Main St",
+                  f"City{uid % 500}", rng.choice(STATES), f"{90000 + uid % 9999:05d}",
+                  ";".join(rng.sample(GENRES, rng.randint(0, 3))))
+                 for uid in range(1, scale["users"] + 1)))
+    write_table(folder, "viewers", ["uid", "subscription", "first_name", "last_name"],
+                ((uid, rng.choice(SUBSCRIPTIONS), f"First{uid}", f"Last{uid}") for uid in viewer_ids))
+    write_table(folder, "producers", ["uid", "bio", "company"],
+                ((uid, f"Producer {uid} bio", f"Studio {uid % 50}") for uid in producer_ids))
+    write_table(folder, "releases", ["rid", "producer_uid", "title", "genre", "release_date"],
+                ((rid, rng.choice(producer_ids), f"Release {rid}", rng.choice(GENRES), timestamp(rng).date())
+                 for rid in release_ids))
+
+    # Even rids are series with several episodes, odd rids are movies with one video.
+    episodes = {rid: (rng.randint(2, 20) if rid % 2 == 0 else 1) for rid in release_ids}
+    write_table(folder, "series", ["rid", "introduction"],
+                ((rid, f"Series {rid} introduction") for rid in release_ids if rid % 2 == 0))
+    write_table(folder, "movies", ["rid", "website_url"],
+                ((rid, f"https://example.com/movies/{rid}") for rid in release_ids if rid % 2 == 1))
+    write_table(folder, "videos", ["rid", "ep_num", "title", "length"],
+                ((rid, ep_num, f"Release {rid} episode {ep_num}", rng.randint(20, 150))
+                 for rid in release_ids for ep_num in range(1, episodes[rid] + 1)))
+
+    release_weights = zipf_weights(len(release_ids))
+    viewer_weights = zipf_weights(len(viewer_ids))
+    shuffled_viewers = list(viewer_ids)
+    rng.shuffle(shuffled_viewers)
+
+    def reviews():
+        rids = skewed_ids(rng, release_ids, release_weights, scale["reviews"])
+        uids = skewed_ids(rng, shuffled_viewers, viewer_weights, scale["reviews"])
+        for rvid, (rid, uid) in enumerate(zip(rids, uids), start=1):
+            yield (rvid, uid, rid, f"{rng.randint(10, 50) / 10:.1f}", f"Review {rvid}",
+                   timestamp(rng).strftime("%Y-%m-%d %H:%M:%S"))
+
+    def session_rows():
+        rids = skewed_ids(rng, release_ids, release_weights, scale["sessions"])
+        uids = skewed_ids(rng, shuffled_viewers, viewer_weights, scale["sessions"])
+        for sid, (rid, uid) in enumerate(zip(rids, uids), start=1):
+            started = timestamp(rng)
+            left = started + timedelta(minutes=rng.randint(1, 150))
+            yield (sid, uid, rid, rng.randint(1, episodes[rid]), started.strftime("%Y-%m-%d %H:%M:%S"),
+                   left.strftime("%Y-%m-%d %H:%M:%S"), rng.choice(QUALITIES), rng.choice(DEVICES))
+
+    write_table(folder, "reviews", ["rvid", "uid", "rid", "rating", "comment", "posted_at"], reviews())
+    write_table(folder, "sessions",
+                ["sid", "uid", "rid", "ep_num", "initiate_at", "leave_at", "quality", "device"], session_rows())
+
+    scale["series"] = len(release_ids) // 2
+    scale["movies"] = len(release_ids) - scale["series"]
+    scale["videos"] = sum(episodes.values())
+    scale["seed"] = seed
+    with open(os.path.join(folder, "manifest.json"), 'w') as manifest:
+        json.dump(scale, manifest, indent=2)
+    return scale
+
+def percentile(sorted_samples, fraction):
+    index = max(0, min(len(sorted_samples) - 1, int(round(fraction * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+def summarize(samples):
+    ordered = sorted(samples)
+    total = sum(ordered)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "mean_ms": round(total / len(ordered) * 1000, 3),
+        "throughput_per_s": round(len(ordered) / total, 1) if total > 0 else None,
+    }
+
+def timed(argv, devnull):
+    stdout = sys.stdout
+    sys.stdout = devnull
+    started = time.perf_counter()
+    try:
+        project.handle_command(argv)
+    finally:
+        elapsed = time.perf_counter() - started
+        sys.stdout = stdout
+    return elapsed
+
+def measure_startup(runs=20, budget_ms=STARTUP_BUDGET_MS):
+    """
+    Times "python project.py" with no command (interpreter start, module import and dispatch only)
+    and, separately, a call that also loads the MySQL driver.
+    """
+    cli = [sys.executable, project.__file__]
+    driver = [sys.executable, "-c", "import project; project.load_driver()"]
+    samples = {"cli": [], "driver": []}
+    for _ in range(runs):
+        for name, argv in (("cli", cli), ("driver", driver)):
+            started = time.perf_counter()
+            subprocess.run(argv, stdout=subprocess.DEVNULL, check=True,
+                           cwd=os.path.dirname(os.path.abspath(project.__file__)))
+            samples[name].append(time.perf_counter() - started)
+    results = {name: summarize(times) for name, times in samples.items()}
+    results["budget_ms"] = budget_ms
+    results["within_budget"] = results["cli"]["p50_ms"] <= budget_ms
+    return results
+
+def command_plan(scale, iterations, rng):
+    """
+    (name, argv list) for every query and write command, with arguments drawn from the generated data.
+    Writes use ids past the generated ranges, and deleteViewer removes the viewers insertViewer added.
+    """
+    viewers, releases, sessions = scale["viewers"], scale["releases"], scale["sessions"]
+    new_uids = range(scale["users"] + 1, scale["users"] + iterations + 1)
+    series_rids = [rid for rid in range(2, releases + 1, 2)] or [1]
+
+    def window():
+        start = EPOCH + timedelta(days=rng.randrange(600))
+        return [start.strftime("%Y-%m-%d"), (start + timedelta(days=rng.choice([30, 90]))).strftime("%Y-%m-%d")]
+
+    return [
+        ("listReleases", [["listReleases", str(rng.randint(1, viewers))] for _ in range(iterations)]),
+        ("popularRelease", [["popularRelease", "10"] for _ in range(iterations)]),
+        ("releaseTitle", [["releaseTitle", str(rng.randint(1, sessions))] for _ in range(iterations)]),
+        ("activeViewer", [["activeViewer", "3"] + window() for _ in range(iterations)]),
+        ("videosViewed", [["videosViewed", str(rng.randint(1, releases))] for _ in range(iterations)]),
+        ("insertViewer", [["insertViewer", str(uid), f"bench{uid}@example.com", f"bench{uid}", "1 Bench St",
+                           "Irvine", "CA", "92697", "drama", "2024-01-01", "Bench", str(uid), "free"]
+                          for uid in new_uids]),
+        ("addGenre", [["addGenre", str(uid), "comedy"] for uid in new_uids]),
+        ("insertSession", [["insertSession", str(sessions + offset), str(rng.randint(1, viewers)), "1", "1",
+                            "2024-06-01 10:00:00", "2024-06-01 11:00:00", "1080p", "tv"]
+                           for offset in range(1, iterations + 1)]),
+        ("updateRelease", [["updateRelease", str(rng.randint(1, releases)), f"Retitled {n}"]
+                           for n in range(iterations)]),
+        ("insertMovie", [["insertMovie", str(rid), f"https://example.com/bench/{rid}"]
+                         for rid in series_rids[:iterations]]),
+        ("deleteViewer", [["deleteViewer", str(uid)] for uid in new_uids]),
+    ]
+
+def run(folder, iterations=100, seed=122):
+    with open(os.path.join(folder, "manifest.json")) as manifest:
+        scale = json.load(manifest)
+    rng = random.Random(seed)
+    results = {"scale": scale, "iterations": iterations, "startup": measure_startup(), "commands": {}}
+    with open(os.devnull, 'w') as devnull:
+        import_seconds = timed(["import", folder], devnull)
+        total_rows = sum(scale[table] for table in project.TABLE_DEFINITIONS)
+        results["import"] = {"seconds": round(import_seconds, 3),
+                             "rows_per_second": round(total_rows / import_seconds, 1)}
+        for name, calls in command_plan(scale, iterations, rng):
+            results["commands"][name] = summarize([timed(argv, devnull) for argv in calls])
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate benchmark data and time project.py commands.")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+    generate_parser = subparsers.add_parser("generate")
+    generate_parser.add_argument("folder")
+    generate_parser.add_argument("--sessions", type=int, default=10000)
+    generate_parser.add_argument("--seed", type=int, default=122)
+    run_parser = subparsers.add_parser("run")
+    run_parser.add_argument("folder")
+    run_parser.add_argument("--iterations", type=int, default=100)
+    run_parser.add_argument("--seed", type=int, default=122)
+    run_parser.add_argument("--pool", action="store_true", help="reuse pooled connections between commands")
+    run_parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    startup_parser = subparsers.add_parser("startup")
+    startup_parser.add_argument("--runs", type=int, default=20)
+    startup_parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    options = parser.parse_args()
+
+    if options.action == "generate":
+        print(json.dumps(generate(options.folder, options.sessions, options.seed), indent=2))
+        return
+    if options.action == "startup":
+        results = measure_startup(options.runs, options.budget_ms)
+        print(json.dumps(results, indent=2))
+        sys.exit(0 if results["within_budget"] else 1)
+    if options.pool:
+        project.use_pool()
+    results = run(options.folder, options.iterations, options.seed)
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Schema-driven checks for import CSV rows, run in Python before rows reach MySQL.
+
+Column names, types and NOT NULL flags are read from the CREATE TABLE statements in project.TABLE_DEFINITIONS.
+A row with the wrong column count or a value that does not parse as its column type goes to a reject file
+with its CSV line number; every other row comes back with its values converted to Python types.
+"""
+import csv
+import os
+import re
+import threading
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+COLUMN_PATTERN = re.compile(r"^`?(\w+)`?\s+(\w+)(?:\((\d+)(?:,\s*(\d+))?\))?(.*?),?$")
+CONSTRAINT_PREFIXES = ("PRIMARY KEY", "FOREIGN KEY", "UNIQUE", "KEY", "INDEX", "CONSTRAINT", "PARTITION")
+INT_RANGE = (-2 ** 31, 2 ** 31 - 1)
+TEXT_BYTES = 65535
+MYSQL_DEFAULT_DECIMAL_DIGITS = 10
+
+def column_specs(create_sql):
+    """
+    [(name, type, size, scale, not_null), ...] in table order.
+    """
+    body = create_sql[create_sql.index("(") + 1:create_sql.rindex(")")]
+    specs = []
+    for line in body.splitlines():
+        line = line.strip()
+        if not line or line.upper().startswith(CONSTRAINT_PREFIXES):
+            continue
+        matched = COLUMN_PATTERN.match(line)
+        if matched is None:
+            continue
+        name, column_type, size, scale, rest = matched.groups()
+        rest = rest.upper()
+        specs.append((name, column_type.upper(), int(size) if size else None, int(scale) if scale else 0,
+                      "NOT NULL" in rest or "PRIMARY KEY" in rest))
+    return specs
+
+def parse_int(value, size, scale):
+    number = int(value)
+    if not INT_RANGE[0] <= number <= INT_RANGE[1]:
+        raise ValueError(f"{value!r} is out of INT range")
+    return number
+
+def parse_decimal(value, size, scale):
+    """
+    Rounds half away from zero to scale places, as MySQL does when it stores a DECIMAL.
+    A bare DECIMAL is DECIMAL(10,0) in MySQL.
+    """
+    if size is None:
+        size = MYSQL_DEFAULT_DECIMAL_DIGITS
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"{value!r} is not a number") from None
+    if not number.is_finite():
+        raise ValueError(f"{value!r} is not a finite number")
+    # Checked before quantize, which raises InvalidOperation for results wider than the context precision.
+    if number and number.adjusted() >= size - scale:
+        raise ValueError(f"{value!r} does not fit DECIMAL({size},{scale})")
+    try:
+        number = number.quantize(Decimal(1).scaleb(-scale), rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError(f"{value!r} does not fit DECIMAL({size},{scale})") from None
+    if abs(number) >= Decimal(10) ** (size - scale):
+        raise ValueError(f"{value!r} does not fit DECIMAL({size},{scale})")
+    return number
+
+def parse_date(value, size, scale):
+    return date.fromisoformat(value)
+
+def parse_datetime(value, size, scale):
+    return datetime.fromisoformat(value)
+
+def parse_varchar(value, size, scale):
+    if size is not None and len(value) > size:
+        raise ValueError(f"value is {len(value)} characters, limit is {size}")
+    return value
+
+def parse_text(value, size, scale):
+    if len(value.encode("utf-8")) > TEXT_BYTES:
+        raise ValueError(f"value is longer than {TEXT_BYTES} bytes")
+    return value
+
+PARSERS = {
+    "INT": parse_int,
+    "DECIMAL": parse_decimal,
+    "DATE": parse_date,
+    "DATETIME": parse_datetime,
+    "VARCHAR": parse_varchar,
+    "TEXT": parse_text,
+}
+
+def make_validator(create_sql):
+    """
+    Returns validate(row) -> converted values, raising ValueError with the reason for a bad row.
+    """
+    specs = [(name, PARSERS.get(column_type, parse_text), size, scale, not_null)
+             for name, column_type, size, scale, not_null in column_specs(create_sql)]
+
+    def validate(row):
+        if len(row) != len(specs):
+            raise ValueError(f"expected {len(specs)} columns, got {len(row)}")
+        values = []
+        for field, (name, parse, size, scale, not_null) in zip(row, specs):
+            if field == '':
+                if not_null:
+                    raise ValueError(f"{name} is empty but NOT NULL")
+                values.append(None)
+                continue
+            try:
+                values.append(parse(field, size, scale))
+            except ValueError as err:
+                raise ValueError(f"{name}: {err}") from None
+        return values
+
+    return validate
+
+class RejectWriter:
+    """
+    Writes rejected rows to <directory>/<table>.rejects.csv as line, reason, original fields.
+    The file is only created when the first row is rejected; with append, an existing file is added to.
+    """
+
+    def __init__(self, directory, table, append=False):
+        self.path = os.path.join(directory, f"{table}.rejects.csv")
+        self.directory = directory
+        self.append = append
+        self.count = 0
+        self.file = None
+        self.writer = None
+        self.lock = threading.Lock()
+
+    def reject(self, line_number, row, reason):
+        with self.lock:
+            if self.writer is None:
+                os.makedirs(self.directory, exist_ok=True)
+                existing = self.append and os.path.exists(self.path)
+                self.file = open(self.path, 'a' if existing else 'w', newline='')
+                self.writer = csv.writer(self.file)
+                if not existing:
+                    self.writer.writerow(["line", "reason", "fields"])
+            self.writer.writerow([line_number, str(reason)] + list(row))
+            self.count += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
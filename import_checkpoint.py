@@ -0,0 +1,65 @@
+"""
+Progress file for import --checkpoint.
+
+Each table commits every chunk and then records the CSV line of the last committed row, so a run that dies
+partway can be restarted with the same command and pick up from there. The file also holds the checksums of the
+input CSVs; if any of them changed since the checkpoint was written, the import starts over from scratch.
+"""
+import json
+import os
+import threading
+
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.resumed = False
+        self.state = None
+
+    def start(self, checksums, settings):
+        """
+        Resumes the checkpoint at path when it was written for the same files, otherwise starts a new one.
+        Returns the settings of the run being resumed, or settings for a new run.
+        """
+        if os.path.exists(self.path):
+            with open(self.path) as checkpoint_file:
+                state = json.load(checkpoint_file)
+            if state.get("checksums") == checksums:
+                self.state = state
+                self.resumed = True
+                return state["settings"]
+        self.state = {"checksums": checksums, "settings": settings, "tables": {}}
+        self.resumed = False
+        self.save()
+        return settings
+
+    def table(self, table):
+        """
+        {"line": last committed CSV line (1 is the header), "rows": rows committed, "done": bool}
+        """
+        return self.state["tables"].get(table, {"line": 1, "rows": 0, "done": False})
+
+    def advance(self, table, line, rows, done=False):
+        with self.lock:
+            self.state["tables"][table] = {"line": line, "rows": rows, "done": done}
+            self.save()
+
+    def finish(self, table, rows):
+        self.advance(table, self.table(table)["line"], rows, done=True)
+
+    def reset(self, table):
+        with self.lock:
+            self.state["tables"].pop(table, None)
+            self.save()
+
+    def save(self):
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, 'w') as checkpoint_file:
+            json.dump(self.state, checkpoint_file)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temporary_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,227 @@
+"""
+Readers for the files import accepts for each table: {name}.csv, {name}.csv.gz, {name}.csv.zst or {name}.parquet.
+
+open_rows(path) gives the same thing for all of them, a csv.reader-like iterator of string lists (header first)
+with a line_num attribute. Compressed files are decompressed as they are read and Parquet files are read one
+row group batch at a time, so nothing is staged on disk. zstandard and pyarrow are only needed for their formats.
+A plain .csv can also be cut into byte ranges with split_csv and read one range at a time, for parallel loading.
+"""
+import csv
+import gzip
+import io
+import mmap
+import os
+from contextlib import contextmanager
+from datetime import date, datetime
+
+INPUT_SUFFIXES = (".csv", ".csv.gz", ".csv.zst", ".parquet")
+PARQUET_BATCH_ROWS = 10000
+COUNT_BLOCK_BYTES = 16 * 1024 * 1024
+
+def find_input(folder_name, name):
+    """
+    The file name of the first {name}{suffix} in folder_name, in INPUT_SUFFIXES order, or None.
+    """
+    for suffix in INPUT_SUFFIXES:
+        if os.path.exists(os.path.join(folder_name, name + suffix)):
+            return name + suffix
+    return None
+
+def open_zstd(path):
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(f"reading {path} needs the zstandard package") from None
+    stream = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return io.TextIOWrapper(stream, newline='')
+
+def format_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+class ParquetReader:
+    """
+    Iterates a Parquet file as CSV-style rows: the column names, then each row's values formatted as text.
+    line_num counts rows the way csv.reader counts lines, with the header as line 1.
+    """
+
+    def __init__(self, path):
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError(f"reading {path} needs the pyarrow package") from None
+        self.file = pyarrow.parquet.ParquetFile(path)
+        self.line_num = 0
+        self.rows = self.read_rows()
+
+    def read_rows(self):
+        self.line_num = 1
+        yield list(self.file.schema_arrow.names)
+        for batch in self.file.iter_batches(batch_size=PARQUET_BATCH_ROWS):
+            columns = [column.to_pylist() for column in batch.columns]
+            for row in zip(*columns):
+                self.line_num += 1
+                yield [format_value(value) for value in row]
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.rows)
+
+    def close(self):
+        self.file.close()
+
+def count_bytes(data, needle, start, end):
+    total = 0
+    for offset in range(start, end, COUNT_BLOCK_BYTES):
+        total += data[offset:min(offset + COUNT_BLOCK_BYTES, end)].count(needle)
+    return total
+
+def split_csv(path, parts):
+    """
+    Cuts the records of a CSV (everything after its header line) into at most parts byte ranges of about equal size.
+    Returns [(start, end, first_line), ...] where first_line is the file line number the range starts on.
+    A cut only falls after a newline that is preceded by an even number of quote characters, so a quoted field
+    with newlines in it is never split; the quotes are counted in C-speed blocks, not parsed. The cuts are then
+    checked against csv.reader, and a file where they do not match comes back as a single range.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as data_file:
+        header = data_file.readline()
+    if size <= len(header):
+        return []
+    with open(path, 'rb') as data_file, mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        ranges = []
+        start = position = len(header)
+        first_line = 2
+        quotes = header.count(b'"')
+        for part in range(1, parts + 1):
+            target = size if part == parts else max(size * part // parts, start)
+            quotes += count_bytes(data, b'"', position, target)
+            position = target
+            while position < size and (quotes % 2 or data[position - 1] != ord("\n")):
+                newline = data.find(b"\n", position)
+                end = size if newline == -1 else newline + 1
+                quotes += count_bytes(data, b'"', position, end)
+                position = end
+            if position > start:
+                ranges.append((start, position, first_line))
+                first_line += count_bytes(data, b"\n", start, position)
+                start = position
+    if not cuts_at_record_ends(path, len(header), [end for _, end, _ in ranges[:-1]]):
+        return [(len(header), size, 2)]
+    return ranges
+
+def cuts_at_record_ends(path, start, cuts):
+    """
+    True when csv.reader, reading from start, finishes a record exactly at every offset in cuts (ascending).
+    Quote parity alone is fooled by a bare quote inside an unquoted field (12" screen), which csv.reader keeps
+    as a literal character, so split_csv checks its cuts with one reader pass up to the last of them.
+    """
+    remaining = list(cuts)
+    if not remaining:
+        return True
+    with open(path, 'rb') as data_file:
+        data_file.seek(start)
+        position = start
+
+        def lines():
+            nonlocal position
+            for line in data_file:
+                position += len(line)
+                yield line.decode("utf-8", errors="replace")
+
+        try:
+            for _ in csv.reader(lines()):
+                if position > remaining[0]:
+                    return False
+                if position == remaining[0]:
+                    remaining.pop(0)
+                    if not remaining:
+                        return True
+        except csv.Error:
+            return False
+    return False
+
+class ByteRange(io.RawIOBase):
+    def __init__(self, path, start, end):
+        self.file = open(path, 'rb')
+        self.file.seek(start)
+        self.remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.remaining)
+        if size <= 0:
+            return 0
+        read = self.file.readinto(memoryview(buffer)[:size])
+        self.remaining -= read
+        return read
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+class RangeReader:
+    """
+    csv.reader over one range from split_csv, preceded by the file's header row as if the range were a whole file.
+    line_num is the line number in the whole file.
+    """
+
+    def __init__(self, path, start, end, first_line):
+        with open(path, 'r', newline='') as header_file:
+            self.header = next(csv.reader(header_file), [])
+        self.stream = io.TextIOWrapper(io.BufferedReader(ByteRange(path, start, end)), newline='')
+        self.reader = csv.reader(self.stream)
+        self.line_offset = first_line - 1
+        self.line_num = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.line_num == 0:
+            self.line_num = 1
+            return self.header
+        row = next(self.reader)
+        self.line_num = self.line_offset + self.reader.line_num
+        return row
+
+    def close(self):
+        self.stream.close()
+
+@contextmanager
+def open_rows(path, byte_range=None):
+    """
+    byte_range is a (start, end, first_line) from split_csv to read only that part of a plain .csv.
+    """
+    if byte_range is not None:
+        reader = RangeReader(path, *byte_range)
+        try:
+            yield reader
+        finally:
+            reader.close()
+        return
+    if path.endswith(".parquet"):
+        reader = ParquetReader(path)
+        try:
+            yield reader
+        finally:
+            reader.close()
+        return
+    if path.endswith(".gz"):
+        stream = gzip.open(path, 'rt', newline='')
+    elif path.endswith(".zst"):
+        stream = open_zstd(path)
+    else:
+        stream = open(path, 'r', newline='')
+    with stream:
+        yield csv.reader(stream)
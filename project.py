@@ -1,193 +1,968 @@
 import sys
 import os
-import csv
-import mysql.connector
 
-def connect_db():
-    return mysql.connector.connect(user='test', password='password', database='cs122a')
+# Everything else, including the MySQL driver, is imported by the code that needs it so that a CLI call
+# only pays for the modules its command uses. load_driver() binds the global mysql on first connection.
+mysql = None
 
-def import_data(folder_name):
-    conn = connect_db()
-    cursor = conn.cursor()
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_IMPORT_WORKERS = 4
+# Plain .csv files at least this big are split across options["processes"] worker processes.
+PARALLEL_SPLIT_MIN_BYTES = 64 * 1024 * 1024
+DEFAULT_IMPORT_OPTIONS = {
+    "chunk_size": DEFAULT_CHUNK_SIZE,
+    "local_infile": False,
+    "validate": False,
+    "rejects_dir": "rejects",
+    "upsert": False,
+    "checkpoint": None,
+    "fast": False,
+    "processes": 1,
+}
+
+TABLE_DEFINITIONS = {
+    "users": """
+        CREATE TABLE users (
+            uid INT PRIMARY KEY,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            joined_date DATE,
+            nickname VARCHAR(255),
+            street VARCHAR(255),
+            city VARCHAR(255),
+            state VARCHAR(255),
+            `zip` VARCHAR(255),
+            genres VARCHAR(255)
+        );
+    """,
+    "viewers": """
+        CREATE TABLE viewers (
+            uid INT PRIMARY KEY,
+            subscription VARCHAR(255),
+            first_name VARCHAR(255),
+            last_name VARCHAR(255),
+            FOREIGN KEY (uid) REFERENCES users(uid) ON DELETE CASCADE
+        );
+    """,
+    "producers": """
+        CREATE TABLE producers (
+            uid INT PRIMARY KEY,
+            bio TEXT,
+            company VARCHAR(255),
+            FOREIGN KEY (uid) REFERENCES users(uid) ON DELETE CASCADE
+        );
+    """,
+    "releases": """
+        CREATE TABLE releases (
+            rid INT PRIMARY KEY,
+            producer_uid INT,
+            title VARCHAR(255) NOT NULL,
+            genre VARCHAR(255),
+            release_date DATE,
+            FOREIGN KEY (producer_uid) REFERENCES producers(uid) ON DELETE CASCADE
+        );
+    """,
+    "series": """
+        CREATE TABLE series (
+            rid INT PRIMARY KEY,
+            introduction TEXT,
+            FOREIGN KEY (rid) REFERENCES releases(rid) ON DELETE CASCADE
+        );
+    """,
+    "movies": """
+        CREATE TABLE movies (
+            rid INT PRIMARY KEY,
+            website_url VARCHAR(255),
+            FOREIGN KEY (rid) REFERENCES releases(rid) ON DELETE CASCADE
+        );
+    """,
+    "videos": """
+        CREATE TABLE videos (
+            rid INT,
+            ep_num INT,
+            title VARCHAR(255),
+            length INT,
+            PRIMARY KEY (rid, ep_num),
+            FOREIGN KEY (rid) REFERENCES releases(rid) ON DELETE CASCADE
+        );
+    """,
+    "reviews": """
+        CREATE TABLE reviews (
+            rvid INT PRIMARY KEY,
+            uid INT,
+            rid INT,
+            rating DECIMAL(3,1),
+            comment TEXT,
+            posted_at DATETIME,
+            FOREIGN KEY (uid) REFERENCES viewers(uid) ON DELETE CASCADE,
+            FOREIGN KEY (rid) REFERENCES releases(rid) ON DELETE CASCADE
+        );
+    """,
+    "sessions": """
+        CREATE TABLE sessions (
+            sid INT PRIMARY KEY,
+            uid INT,
+            rid INT,
+            ep_num INT,
+            initiate_at DATETIME,
+            leave_at DATETIME,
+            quality VARCHAR(255),
+            device VARCHAR(255),
+            FOREIGN KEY (uid) REFERENCES viewers(uid) ON DELETE CASCADE,
+            FOREIGN KEY (rid, ep_num) REFERENCES videos(rid, ep_num) ON DELETE CASCADE
+        );
+    """,
+}
+
+# Rollup tables derived from reviews and sessions. import_data and rebuildRollups fill them in one pass;
+# the write paths in this file keep them current (deleteViewer's cascade removes reviews and sessions).
+RELEASE_STATS_DEFINITION = """
+    CREATE TABLE release_stats (
+        rid INT PRIMARY KEY,
+        review_count INT NOT NULL DEFAULT 0,
+        KEY idx_release_stats_count (review_count, rid),
+        FOREIGN KEY (rid) REFERENCES releases(rid) ON DELETE CASCADE
+    );
+"""
+RELEASE_STATS_ROWS_SQL = """
+    INSERT INTO release_stats (rid, review_count)
+    SELECT r.rid, COUNT(rev.rid)
+    FROM releases r
+    LEFT JOIN reviews rev ON r.rid = rev.rid
+    {release_filter}
+    GROUP BY r.rid
+"""
+BUILD_RELEASE_STATS_SQL = RELEASE_STATS_ROWS_SQL.format(release_filter="")
+VIEWER_DAILY_SESSIONS_DEFINITION = """
+    CREATE TABLE viewer_daily_sessions (
+        day DATE,
+        uid INT,
+        session_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, uid),
+        FOREIGN KEY (uid) REFERENCES viewers(uid) ON DELETE CASCADE
+    );
+"""
+VIEWER_DAILY_SESSIONS_ROWS_SQL = """
+    INSERT INTO viewer_daily_sessions (day, uid, session_count)
+    SELECT DATE(initiate_at), uid, COUNT(*)
+    FROM sessions
+    WHERE uid IS NOT NULL AND initiate_at IS NOT NULL {session_filter}
+    GROUP BY DATE(initiate_at), uid
+"""
+BUILD_VIEWER_DAILY_SESSIONS_SQL = VIEWER_DAILY_SESSIONS_ROWS_SQL.format(session_filter="")
+ROLLUP_TABLES = {
+    "release_stats": (RELEASE_STATS_DEFINITION, BUILD_RELEASE_STATS_SQL),
+    "viewer_daily_sessions": (VIEWER_DAILY_SESSIONS_DEFINITION, BUILD_VIEWER_DAILY_SESSIONS_SQL),
+}
+
+# Monthly RANGE partitioning of sessions on initiate_at, chosen with import --partition-sessions.
+# MySQL requires the partitioning column in every unique key and allows no foreign keys on partitioned tables,
+# so the key becomes (sid, initiate_at), initiate_at is NOT NULL, and SESSIONS_CHECK_TRIGGERS keep sid unique and
+# stand in for the two foreign keys on insert and update; cascades become explicit deletes (deleteViewer,
+# import --incremental), and incremental upserts replace sessions rows instead of updating them in place.
+PARTITIONED_SESSIONS_DEFINITION = """
+    CREATE TABLE sessions (
+        sid INT,
+        uid INT,
+        rid INT,
+        ep_num INT,
+        initiate_at DATETIME NOT NULL,
+        leave_at DATETIME,
+        quality VARCHAR(255),
+        device VARCHAR(255),
+        PRIMARY KEY (sid, initiate_at),
+        KEY idx_sessions_uid (uid),
+        KEY idx_sessions_rid_ep (rid, ep_num)
+    )
+    PARTITION BY RANGE COLUMNS (initiate_at) (
+        {partitions}
+    );
+"""
+SESSIONS_CHECK_TRIGGER = """
+    CREATE TRIGGER sessions_{event}_check BEFORE {event} ON sessions FOR EACH ROW
+    BEGIN
+        IF {sid_changed}EXISTS (SELECT 1 FROM sessions WHERE sid = NEW.sid) THEN
+            SIGNAL SQLSTATE '23000'
+                SET MESSAGE_TEXT = 'Duplicate entry for sessions.sid', MYSQL_ERRNO = 1062;
+        END IF;
+        IF NEW.uid IS NOT NULL AND NOT EXISTS (SELECT 1 FROM viewers WHERE uid = NEW.uid) THEN
+            SIGNAL SQLSTATE '23000'
+                SET MESSAGE_TEXT = 'sessions.uid has no matching viewers row', MYSQL_ERRNO = 1452;
+        END IF;
+        IF NEW.rid IS NOT NULL AND NEW.ep_num IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM videos WHERE rid = NEW.rid AND ep_num = NEW.ep_num) THEN
+            SIGNAL SQLSTATE '23000'
+                SET MESSAGE_TEXT = 'sessions (rid, ep_num) has no matching videos row', MYSQL_ERRNO = 1452;
+        END IF;
+    END
+"""
+SESSIONS_CHECK_TRIGGERS = [
+    SESSIONS_CHECK_TRIGGER.format(event="INSERT", sid_changed=""),
+    SESSIONS_CHECK_TRIGGER.format(event="UPDATE", sid_changed="NEW.sid <> OLD.sid AND "),
+]
+DEFAULT_PARTITION_HISTORY_MONTHS = 24
+DEFAULT_PARTITION_MONTHS_AHEAD = 3
+
+# Optional normalized copy of users.genres, created by the migrateGenres command.
+# users.genres stays the display copy; user_genres carries the case-insensitive duplicate check and genre lookups.
+USER_GENRES_DEFINITION = """
+    CREATE TABLE user_genres (
+        uid INT,
+        genre VARCHAR(255) NOT NULL,
+        genre_key VARCHAR(255) AS (LOWER(genre)) STORED,
+        UNIQUE KEY uq_user_genre (uid, genre_key),
+        KEY idx_genre_audience (genre_key, uid),
+        FOREIGN KEY (uid) REFERENCES users(uid) ON DELETE CASCADE
+    );
+"""
+
+# Splits users.genres on ';' in SQL so migration, insertViewer and batch mode share one statement.
+SYNC_USER_GENRES_SQL = """
+    INSERT IGNORE INTO user_genres (uid, genre)
+    WITH RECURSIVE split (uid, genre, rest) AS (
+        SELECT uid,
+               TRIM(SUBSTRING_INDEX(genres, ';', 1)),
+               IF(LOCATE(';', genres) > 0, SUBSTRING(genres, LOCATE(';', genres) + 1), NULL)
+        FROM users
+        WHERE genres IS NOT NULL AND genres <> '' {user_filter}
+        UNION ALL
+        SELECT uid,
+               TRIM(SUBSTRING_INDEX(rest, ';', 1)),
+               IF(LOCATE(';', rest) > 0, SUBSTRING(rest, LOCATE(';', rest) + 1), NULL)
+        FROM split
+        WHERE rest IS NOT NULL
+    )
+    SELECT uid, genre FROM split WHERE genre <> ''
+"""
+SYNC_ALL_USER_GENRES_SQL = SYNC_USER_GENRES_SQL.format(user_filter="")
+SYNC_ONE_USER_GENRES_SQL = SYNC_USER_GENRES_SQL.format(user_filter="AND uid = %s")
+
+# Checksum of every CSV the last import applied, so import --incremental can skip files that have not changed.
+# Keyed by file name: {table}.csv for rows to upsert, {table}.deletes.csv for primary keys to delete
+# (or the .csv.gz, .csv.zst or .parquet file that stands in for either).
+IMPORT_STATE_DEFINITION = """
+    CREATE TABLE IF NOT EXISTS import_state (
+        file_name VARCHAR(255) PRIMARY KEY,
+        checksum CHAR(64) NOT NULL,
+        loaded_rows INT NOT NULL,
+        loaded_at DATETIME NOT NULL
+    );
+"""
+RECORD_IMPORT_STATE_SQL = """
+    INSERT INTO import_state (file_name, checksum, loaded_rows, loaded_at)
+    VALUES (%s, %s, %s, NOW())
+    ON DUPLICATE KEY UPDATE checksum = VALUES(checksum), loaded_rows = VALUES(loaded_rows),
+                            loaded_at = VALUES(loaded_at)
+"""
+
+DB_CONFIG = {'user': 'test', 'password': 'password', 'database': 'cs122a'}
+DEFAULT_POOL_SIZE = 5
+
+connection_pool = None
+tracer = None
+statement_registry = None
+
+def load_driver():
+    """
+    Imports mysql.connector and, when the _mysql_connector C extension is installed, makes every
+    connection (pooled ones too) use it instead of the pure-Python protocol.
+    """
+    global mysql
+    if mysql is None:
+        import mysql.connector
+        import mysql.connector.pooling
+        DB_CONFIG.setdefault("use_pure", not mysql.connector.HAVE_CEXT)
+    return mysql
+
+def use_pool(pool_size=DEFAULT_POOL_SIZE):
+    """
+    Switches connect_db() over to a shared mysql.connector pool.
+    Pooled connections go back to the pool on close(), so the command functions keep their connect/close pattern.
+    Resetting a session deallocates its prepared statements, so sessions are not reset while the statement
+    registry is on; every command commits or rolls back before it closes, so no transaction carries over,
+    foreign_key_checks is only turned off through ForeignKeyChecksOff, and the fast-import settings are made on
+    connections opened outside the pool (connect_db with options).
+    """
+    global connection_pool
+    if connection_pool is None:
+        load_driver()
+        connection_pool = mysql.connector.pooling.MySQLConnectionPool(
+            pool_name="cs122a", pool_size=pool_size, pool_reset_session=statement_registry is None, **DB_CONFIG)
+    return connection_pool
+
+def use_statement_registry():
+    """
+    Turns on server-side prepared statements for the hot paths (see statements.py). Call before use_pool().
+    """
+    global statement_registry
+    if statement_registry is None:
+        import statements
+        statement_registry = statements.StatementRegistry()
+    return statement_registry
+
+def execute_statement(conn, cursor, sql, params):
+    """
+    cursor.execute(sql, params), or the registry's prepared statement for sql on conn when the registry is on.
+    Returns the cursor that holds the result.
+    """
+    if statement_registry is None or conn is None:
+        cursor.execute(sql, params)
+        return cursor
+    return statement_registry.execute(conn, sql, params)
+
+def open_connection(**options):
+    load_driver()
+    if connection_pool is not None and not options:
+        return connection_pool.get_connection()
+    return mysql.connector.connect(**DB_CONFIG, **options)
+
+def connect_db(**options):
+    trace = tracer.active if tracer is not None else None
+    if trace is None:
+        return open_connection(**options)
+    return trace.connect(open_connection, **options)
+
+def local_infile_enabled(cursor):
     try:
-        cursor.execute("SET FOREIGN_KEY_CHECKS = 0;")
-        
-        drop_tables = ["sessions", "reviews", "videos", "movies", "series", "releases", "viewers", "producers", "users"]
-        for table in drop_tables:
-            cursor.execute(f"DROP TABLE IF EXISTS {table};")
-        
-        cursor.execute("""
-            CREATE TABLE users (
-                uid INT PRIMARY KEY,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                joined_date DATE,
-                nickname VARCHAR(255),
-                street VARCHAR(255),
-                city VARCHAR(255),
-                state VARCHAR(255),
-                `zip` VARCHAR(255),
-                genres VARCHAR(255)
-            );
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE viewers (
-                uid INT PRIMARY KEY,
-                subscription VARCHAR(255),
-                first_name VARCHAR(255),
-                last_name VARCHAR(255),
-                FOREIGN KEY (uid) REFERENCES users(uid) ON DELETE CASCADE
-            );
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE producers (
-                uid INT PRIMARY KEY,
-                bio TEXT,
-                company VARCHAR(255),
-                FOREIGN KEY (uid) REFERENCES users(uid) ON DELETE CASCADE
-            );
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE releases (
-                rid INT PRIMARY KEY,
-                producer_uid INT,
-                title VARCHAR(255) NOT NULL,
-                genre VARCHAR(255),
-                release_date DATE,
-                FOREIGN KEY (producer_uid) REFERENCES producers(uid) ON DELETE CASCADE
-            );
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE series (
-                rid INT PRIMARY KEY,
-                introduction TEXT,
-                FOREIGN KEY (rid) REFERENCES releases(rid) ON DELETE CASCADE
-            );
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE movies (
-                rid INT PRIMARY KEY,
-                website_url VARCHAR(255),
-                FOREIGN KEY (rid) REFERENCES releases(rid) ON DELETE CASCADE
-            );
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE videos (
-                rid INT,
-                ep_num INT,
-                title VARCHAR(255),
-                length INT,
-                PRIMARY KEY (rid, ep_num),
-                FOREIGN KEY (rid) REFERENCES releases(rid) ON DELETE CASCADE
-            );
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE reviews (
-                rvid INT PRIMARY KEY,
-                uid INT,
-                rid INT,
-                rating DECIMAL(3,1),
-                comment TEXT,
-                posted_at DATETIME,
-                FOREIGN KEY (uid) REFERENCES viewers(uid) ON DELETE CASCADE,
-                FOREIGN KEY (rid) REFERENCES releases(rid) ON DELETE CASCADE
-            );
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE sessions (
-                sid INT PRIMARY KEY,
-                uid INT,
-                rid INT,
-                ep_num INT,
-                initiate_at DATETIME,
-                leave_at DATETIME,
-                quality VARCHAR(255),
-                device VARCHAR(255),
-                FOREIGN KEY (uid) REFERENCES viewers(uid) ON DELETE CASCADE,
-                FOREIGN KEY (rid, ep_num) REFERENCES videos(rid, ep_num) ON DELETE CASCADE
-            );
-        """)
-        
-        cursor.execute("SET FOREIGN_KEY_CHECKS = 1;")
-        tables_for_import = ["users", "viewers", "producers", "releases", "series", "movies", "videos", "reviews", "sessions"]
-        for table in tables_for_import:
-            csv_path = os.path.join(folder_name, f"{table}.csv")
-            if not os.path.exists(csv_path):
+        cursor.execute("SELECT @@GLOBAL.local_infile")
+        return bool(int(cursor.fetchone()[0]))
+    except mysql.connector.Error:
+        return False
+
+class ForeignKeyChecksOff:
+    """
+    with ForeignKeyChecksOff(cursor): turns foreign_key_checks off for the block and back on however it exits.
+    Pooled connections are not reset in repl and batch mode, so a setting left behind would reach later commands.
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __enter__(self):
+        self.cursor.execute("SET FOREIGN_KEY_CHECKS = 0;")
+
+    def __exit__(self, error_type, error, traceback):
+        try:
+            self.cursor.execute("SET FOREIGN_KEY_CHECKS = 1;")
+        except mysql.connector.Error:
+            # A connection that broke loses its session anyway; keep the original error.
+            if error_type is None:
+                raise
+        return False
+
+def read_chunks(csv_reader, chunk_size, validate=None, rejects=None):
+    """
+    Yields (line_numbers, rows) lists of up to chunk_size rows, with '' turned into None.
+    With validate, rows are converted by it and the ones it raises ValueError for go to rejects instead.
+    """
+    line_numbers = []
+    chunk = []
+    for row in csv_reader:
+        if validate is None:
+            chunk.append([None if field == '' else field for field in row])
+        else:
+            try:
+                chunk.append(validate(row))
+            except ValueError as err:
+                rejects.reject(csv_reader.line_num, row, err)
                 continue
-            with open(csv_path, 'r', newline='') as csvfile:
-                csv_reader = csv.reader(csvfile)
-                next(csv_reader, None)
-                for row in csv_reader:
-                    row = [None if field == '' else field for field in row]
-                    placeholders = ", ".join(["%s"] * len(row))
-                    query = f"INSERT INTO {table} VALUES ({placeholders})"
-                    cursor.execute(query, row)
-        
+        line_numbers.append(csv_reader.line_num)
+        if len(chunk) >= chunk_size:
+            yield line_numbers, chunk
+            line_numbers = []
+            chunk = []
+    if chunk:
+        yield line_numbers, chunk
+
+def load_infile(cursor, table, csv_path):
+    """
+    Loads a whole CSV with LOAD DATA LOCAL INFILE inside a savepoint.
+    The csv module gives backslash no special meaning, so neither does the load (ESCAPED BY '').
+    With LOCAL the server downgrades duplicate-key and conversion errors to warnings and skips the row,
+    so any warning rolls the table back and returns None to make the caller use the executemany path.
+    """
+    with open(csv_path, 'rb') as csvfile:
+        first_line = csvfile.readline()
+    line_terminator = "\\r\\n" if first_line.endswith(b"\r\n") else "\\n"
+
+    cursor.execute(f"SHOW COLUMNS FROM {table}")
+    columns = [row[0] for row in cursor.fetchall()]
+    variables = ", ".join(f"@{column}" for column in columns)
+    assignments = ", ".join(f"`{column}` = NULLIF(@{column}, '')" for column in columns)
+
+    cursor.execute(f"SAVEPOINT load_{table}")
+    try:
+        cursor.execute(f"""
+            LOAD DATA LOCAL INFILE %s INTO TABLE {table}
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+            LINES TERMINATED BY '{line_terminator}'
+            IGNORE 1 LINES
+            ({variables})
+            SET {assignments}
+        """, (os.path.abspath(csv_path),))
+        loaded_rows = cursor.rowcount
+        cursor.execute("SHOW COUNT(*) WARNINGS")
+        warning_count = cursor.fetchone()[0]
+    except mysql.connector.Error:
+        cursor.execute(f"ROLLBACK TO SAVEPOINT load_{table}")
+        return None
+    if warning_count:
+        cursor.execute(f"ROLLBACK TO SAVEPOINT load_{table}")
+        return None
+    cursor.execute(f"RELEASE SAVEPOINT load_{table}")
+    return loaded_rows
+
+def load_rows(cursor, table, csv_path, options, byte_range=None):
+    """
+    Streams a CSV through executemany in chunks of options["chunk_size"] rows.
+    With options["upsert"], rows whose key already exists update it in place instead of failing.
+    A chunk that fails is replayed row by row so the error names the offending CSV line.
+    With options["validate"], rows are type-checked against the schema first and bad ones are written to
+    options["rejects_dir"] instead of failing the import.
+    With options["checkpoint"], every chunk is committed and recorded, and rows up to the recorded line are skipped.
+    byte_range (start, end, first_line, part) loads only that range of a plain .csv, for load_parallel.
+    """
+    import input_formats
+    checkpoint = options["checkpoint"]
+    progress = checkpoint.table(table) if checkpoint is not None else {"line": 1, "rows": 0}
+    validate = rejects = None
+    if options["validate"]:
+        import csv_validation
+        validate = csv_validation.make_validator(TABLE_DEFINITIONS[table])
+        reject_name = table if byte_range is None else f"{table}.part{byte_range[3]}"
+        rejects = csv_validation.RejectWriter(options["rejects_dir"], reject_name, append=progress["line"] > 1)
+    loaded_rows = progress["rows"]
+    try:
+        with input_formats.open_rows(csv_path, byte_range and byte_range[:3]) as csv_reader:
+            header = next(csv_reader, None)
+            if header is None:
+                return 0
+            while csv_reader.line_num < progress["line"]:
+                if next(csv_reader, None) is None:
+                    break
+            placeholders = ", ".join(["%s"] * len(header))
+            query = f"INSERT INTO {table} VALUES ({placeholders})"
+            replace_query = None
+            if options["upsert"] and table == "sessions" and session_partitions(cursor):
+                # Partitioned sessions keeps sid unique with a trigger, which ON DUPLICATE KEY UPDATE does not see,
+                # so existing sessions (sid is the first column) are deleted and inserted again; nothing
+                # references sessions rows.
+                replace_query = "DELETE FROM sessions WHERE sid = %s"
+            elif options["upsert"]:
+                cursor.execute(f"SHOW COLUMNS FROM {table}")
+                columns = [row[0] for row in cursor.fetchall()]
+                # The key columns are left alone, so a row that collides on another unique key (users.email)
+                # updates the existing row instead of renumbering it.
+                key_columns = primary_key_columns(table)
+                query += " ON DUPLICATE KEY UPDATE " + ", ".join(f"`{column}` = VALUES(`{column}`)"
+                                                                 for column in columns if column not in key_columns)
+            for line_numbers, chunk in read_chunks(csv_reader, options["chunk_size"], validate, rejects):
+                cursor.execute(f"SAVEPOINT chunk_{table}")
+                try:
+                    if replace_query is not None:
+                        cursor.executemany(replace_query, [row[:1] for row in chunk])
+                    cursor.executemany(query, chunk)
+                except mysql.connector.Error:
+                    cursor.execute(f"ROLLBACK TO SAVEPOINT chunk_{table}")
+                    for line_number, row in zip(line_numbers, chunk):
+                        try:
+                            if replace_query is not None:
+                                cursor.execute(replace_query, row[:1])
+                            cursor.execute(query, row)
+                        except mysql.connector.Error as err:
+                            print(f"{os.path.basename(csv_path)} line {line_number}: {err}", file=sys.stderr)
+                            raise
+                cursor.execute(f"RELEASE SAVEPOINT chunk_{table}")
+                loaded_rows += len(chunk)
+                if checkpoint is not None:
+                    cursor.execute("COMMIT")
+                    checkpoint.advance(table, line_numbers[-1], loaded_rows)
+    finally:
+        if rejects is not None:
+            rejects.close()
+            if rejects.count:
+                print(f"{table}: {rejects.count} rows rejected, see {rejects.path}", file=sys.stderr)
+    return loaded_rows
+
+def load_table(cursor, table, csv_path, options=None):
+    import time
+    options = dict(DEFAULT_IMPORT_OPTIONS, **(options or {}))
+    started = time.perf_counter()
+    loaded_rows = None
+    method = "load data"
+    # LOAD DATA hands the file straight to the server, so it is only used when rows need no Python-side checks.
+    # Its REPLACE mode deletes before inserting, which would fire ON DELETE CASCADE, so upserts skip it too.
+    # A checkpointed table that is partly loaded has to carry on from its line, which LOAD DATA cannot do.
+    # Compressed and Parquet files are decoded here and streamed through executemany, never staged on disk.
+    resuming = options["checkpoint"] is not None and options["checkpoint"].table(table)["line"] > 1
+    if (options["local_infile"] and csv_path.endswith(".csv") and not options["validate"] and not options["upsert"]
+            and not resuming):
+        loaded_rows = load_infile(cursor, table, csv_path)
+    if loaded_rows is None:
+        method = "executemany"
+        loaded_rows = load_rows(cursor, table, csv_path, options)
+    elapsed = time.perf_counter() - started
+    rate = loaded_rows / elapsed if elapsed > 0 else 0
+    print(f"{table}: {loaded_rows} rows in {elapsed:.2f}s ({rate:.0f} rows/s, {method})", file=sys.stderr)
+    return loaded_rows
+
+def load_range(db_config, table, csv_path, byte_range, options):
+    """
+    Process-pool worker for load_parallel: loads one byte range on its own connection and commits it.
+    Errors come back as RuntimeError naming the range, since the parent only reports them.
+    """
+    DB_CONFIG.update(db_config)
+    try:
+        conn = connect_db()
+    except Exception as err:
+        raise RuntimeError(f"bytes {byte_range[0]}-{byte_range[1]}: {err}") from None
+    cursor = conn.cursor()
+    try:
+        if options["fast"]:
+            cursor.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0, autocommit = 0")
+        loaded_rows = load_rows(cursor, table, csv_path, options, byte_range)
         conn.commit()
-        print("Success")
-    except mysql.connector.Error as err:
+        return loaded_rows
+    except Exception as err:
         conn.rollback()
-        print("Fail", err)
+        raise RuntimeError(f"bytes {byte_range[0]}-{byte_range[1]}: {err}") from None
     finally:
         cursor.close()
         conn.close()
 
-def insert_viewer(uid, email, nickname, street, city, state, zip_code, genres, joined_date, first_name, last_name, subscription):
+def load_parallel(table, csv_path, options):
     """
-    Inserts a new viewer.
-    Command order: uid, email, nickname, street, city, state, zip, genres, joined_date, first_name, last_name, subscription
-    Note: Users table requires order: uid, email, joined_date, nickname, street, city, state, `zip`, genres
+    Splits csv_path into options["processes"] byte ranges on record boundaries and loads each one in its own
+    process over its own connection, so parsing and inserting one big table use several cores and server threads.
+    Every range commits by itself; if any fails this raises, and the caller empties the table.
     """
-    conn = connect_db()
+    import multiprocessing
+    import time
+    import input_formats
+    from concurrent.futures import ProcessPoolExecutor
+    started = time.perf_counter()
+    ranges = [byte_range + (part,) for part, byte_range in
+              enumerate(input_formats.split_csv(csv_path, options["processes"]))]
+    loaded_rows = 0
+    errors = []
+    # spawn rather than fork: the import scheduler's threads are running when the pool starts.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max(len(ranges), 1), mp_context=context) as executor:
+        futures = [executor.submit(load_range, dict(DB_CONFIG), table, csv_path, byte_range, options)
+                   for byte_range in ranges]
+        for future in futures:
+            try:
+                loaded_rows += future.result()
+            except Exception as err:
+                errors.append(err)
+    if errors:
+        raise errors[0]
+    elapsed = time.perf_counter() - started
+    rate = loaded_rows / elapsed if elapsed > 0 else 0
+    print(f"{table}: {loaded_rows} rows in {elapsed:.2f}s ({rate:.0f} rows/s, executemany in {len(ranges)} processes)",
+          file=sys.stderr)
+    return loaded_rows
+
+def table_dependencies(definitions=TABLE_DEFINITIONS):
+    """
+    Builds the foreign-key graph from the CREATE TABLE statements: table -> set of tables it references.
+    """
+    import re
+    dependencies = {}
+    for table, create_sql in definitions.items():
+        referenced = set(re.findall(r"REFERENCES\s+`?(\w+)`?", create_sql, re.IGNORECASE))
+        referenced.discard(table)
+        dependencies[table] = referenced
+    return dependencies
+
+def foreign_keys(table):
+    """
+    [(columns, referenced table, referenced columns), ...] from the FOREIGN KEY clauses of TABLE_DEFINITIONS[table].
+    """
+    import re
+    pattern = r"FOREIGN KEY\s*\(([^)]*)\)\s*REFERENCES\s+`?(\w+)`?\s*\(([^)]*)\)"
+    return [([column.strip(" `") for column in columns.split(",")], parent,
+             [column.strip(" `") for column in parent_columns.split(",")])
+            for columns, parent, parent_columns in re.findall(pattern, TABLE_DEFINITIONS[table], re.IGNORECASE)]
+
+def secondary_index_additions(table, existing=()):
+    return [f"ADD INDEX {index_name} ({columns})"
+            for index_table, index_name, columns in SECONDARY_INDEXES
+            if index_table == table and index_name not in existing]
+
+def add_secondary_indexes(cursor):
+    """
+    Builds the SECONDARY_INDEXES a table does not have yet, one ALTER TABLE per table, after the load:
+    a sorted build over the loaded rows is cheaper than keeping the indexes up to date row by row.
+    A resumed checkpoint import may already have built them before it stopped.
+    """
+    cursor.execute("SELECT DISTINCT index_name FROM information_schema.statistics WHERE table_schema = DATABASE()")
+    existing = {row[0] for row in cursor.fetchall()}
+    for table in TABLE_DEFINITIONS:
+        additions = secondary_index_additions(table, existing)
+        if additions:
+            cursor.execute(f"ALTER TABLE {table} " + ", ".join(additions))
+
+def deferred_definition(table, create_sql=None):
+    """
+    Splits create_sql (default TABLE_DEFINITIONS[table]) for import --fast into a CREATE TABLE that keeps only the
+    columns, the primary key (InnoDB stores rows in primary key order, so adding it later would rebuild the table)
+    and any partitioning, and the ALTER TABLE that adds everything else: UNIQUE columns, keys, foreign keys and
+    the table's SECONDARY_INDEXES.
+    """
+    import re
+    create_sql = create_sql or TABLE_DEFINITIONS[table]
+    start = create_sql.index("(")
+    depth = 0
+    for end in range(start, len(create_sql)):
+        depth += {"(": 1, ")": -1}.get(create_sql[end], 0)
+        if depth == 0:
+            break
+    body = create_sql[start + 1:end]
+    options = create_sql[end + 1:].strip().rstrip(";").strip()
+    kept = []
+    additions = []
+    for entry in (line.strip().rstrip(",") for line in body.splitlines()):
+        if not entry:
+            continue
+        if entry.upper().startswith(("FOREIGN KEY", "KEY ", "INDEX ")):
+            additions.append("ADD " + entry)
+            continue
+        if re.search(r"\sUNIQUE\b", entry, re.IGNORECASE) and not entry.upper().startswith("UNIQUE"):
+            column = entry.split()[0]
+            entry = re.sub(r"\s+UNIQUE\b", "", entry, flags=re.IGNORECASE)
+            additions.append(f"ADD UNIQUE KEY ({column})")
+        kept.append(entry)
+    additions += secondary_index_additions(table)
+    bare_sql = f"CREATE TABLE {table} (\n    " + ",\n    ".join(kept) + "\n)" + (f"\n{options}" if options else "") + ";"
+    alter_sql = f"ALTER TABLE {table} " + ", ".join(additions) if additions else None
+    return bare_sql, alter_sql
+
+def orphan_rows_sql(table, columns, parent, parent_columns, action="SELECT COUNT(*)"):
+    """
+    Counts (or with action "DELETE c", deletes) rows of table whose foreign key has no parent row.
+    As in InnoDB, a key with a NULL column is not checked.
+    """
+    join = " AND ".join(f"c.`{column}` = p.`{parent_column}`" for column, parent_column in zip(columns, parent_columns))
+    not_null = " AND ".join(f"c.`{column}` IS NOT NULL" for column in columns)
+    return f"""
+        {action} FROM {table} c
+        LEFT JOIN {parent} p ON {join}
+        WHERE {not_null} AND p.`{parent_columns[0]}` IS NULL
+    """
+
+def duplicate_session_problems(cursor):
+    """
+    Partitioned sessions has no unique key on sid alone; returns a problem when loaded rows share a sid.
+    """
+    cursor.execute("SELECT COUNT(*) FROM (SELECT sid FROM sessions GROUP BY sid HAVING COUNT(*) > 1) duplicates")
+    duplicates = cursor.fetchone()[0]
+    return [f"sessions: {duplicates} sids appear in more than one row"] if duplicates else []
+
+def add_deferred_constraints(cursor, definitions=TABLE_DEFINITIONS):
+    """
+    Runs every table's deferred ALTER TABLE, then checks each foreign key for orphaned rows, because the
+    ALTERs run with foreign_key_checks off and so do not look at the rows already loaded.
+    The check covers the foreign keys of TABLE_DEFINITIONS even where definitions leaves them out (partitioned sessions).
+    Returns a list of problems; empty means the tables now match what a normal import creates.
+    """
+    problems = []
+    with ForeignKeyChecksOff(cursor):
+        for table, create_sql in definitions.items():
+            _, alter_sql = deferred_definition(table, create_sql)
+            if alter_sql is None:
+                continue
+            try:
+                cursor.execute(alter_sql)
+            except mysql.connector.Error as err:
+                problems.append(f"{table}: {err}")
+    for table in TABLE_DEFINITIONS:
+        for columns, parent, parent_columns in foreign_keys(table):
+            cursor.execute(orphan_rows_sql(table, columns, parent, parent_columns))
+            orphans = cursor.fetchone()[0]
+            if orphans:
+                problems.append(f"{table}: {orphans} rows with ({', '.join(columns)}) missing from {parent}")
+    return problems
+
+def primary_key_columns(table):
+    import re
+    create_sql = TABLE_DEFINITIONS[table]
+    composite = re.search(r"PRIMARY KEY\s*\(([^)]*)\)", create_sql, re.IGNORECASE)
+    if composite:
+        return [column.strip(" `") for column in composite.group(1).split(",")]
+    return re.findall(r"^\s*`?(\w+)`?\s+\w+[^,\n]*PRIMARY KEY", create_sql, re.IGNORECASE | re.MULTILINE)
+
+def delete_rows(cursor, table, csv_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Deletes the rows whose primary keys are listed in csv_path (a header line, then one key per line).
+    ON DELETE CASCADE removes their dependent rows as it does for deleteViewer.
+    """
+    import input_formats
+    conditions = " AND ".join(f"`{column}` = %s" for column in primary_key_columns(table))
+    query = f"DELETE FROM {table} WHERE {conditions}"
+    deleted_rows = 0
+    with input_formats.open_rows(csv_path) as csv_reader:
+        if next(csv_reader, None) is None:
+            return 0
+        for _, chunk in read_chunks(csv_reader, chunk_size):
+            cursor.executemany(query, chunk)
+            deleted_rows += cursor.rowcount
+    print(f"{table}: {deleted_rows} rows deleted", file=sys.stderr)
+    return deleted_rows
+
+def file_checksum(path):
+    import hashlib
+    digest = hashlib.sha256()
+    with open(path, 'rb') as data:
+        for block in iter(lambda: data.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def import_checksums(folder_name):
+    """
+    {file name: sha256} for the table and delete-list files present in folder_name.
+    """
+    import input_formats
+    checksums = {}
+    for table in TABLE_DEFINITIONS:
+        for name in (table, f"{table}.deletes"):
+            file_name = input_formats.find_input(folder_name, name)
+            if file_name is not None:
+                checksums[file_name] = file_checksum(os.path.join(folder_name, file_name))
+    return checksums
+
+def record_import_state(cursor, checksums, loaded):
+    cursor.executemany(RECORD_IMPORT_STATE_SQL, [
+        (file_name, checksum, loaded.get(file_name, 0)) for file_name, checksum in checksums.items()])
+
+def import_table(folder_name, table, options):
+    import input_formats
+    conn = connect_db(allow_local_infile=options["local_infile"])
     cursor = conn.cursor()
     try:
-        cursor.execute("""
-            INSERT INTO users (uid, email, joined_date, nickname, street, city, state, `zip`, genres)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (uid, email, joined_date, nickname, street, city, state, zip_code, genres))
-        
-        cursor.execute("""
-            INSERT INTO viewers (uid, subscription, first_name, last_name)
-            VALUES (%s, %s, %s, %s)
-        """, (uid, subscription, first_name, last_name))
-        
+        if options["fast"]:
+            cursor.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0, autocommit = 0")
+        file_name = input_formats.find_input(folder_name, table)
+        loaded_rows = 0
+        if file_name is not None:
+            csv_path = os.path.join(folder_name, file_name)
+            if (options["processes"] > 1 and options["checkpoint"] is None and file_name.endswith(".csv")
+                    and os.path.getsize(csv_path) >= PARALLEL_SPLIT_MIN_BYTES):
+                loaded_rows = load_parallel(table, csv_path, options)
+            else:
+                loaded_rows = load_table(cursor, table, csv_path, options)
         conn.commit()
-        print("Success")
-    except mysql.connector.Error as err:
+        if options["checkpoint"] is not None:
+            options["checkpoint"].finish(table, loaded_rows)
+        return loaded_rows
+    except Exception:
         conn.rollback()
-        print("Fail")
+        raise
     finally:
         cursor.close()
         conn.close()
 
-def add_genre(uid, genre):
+def schedule_import(folder_name, options, workers, tables=None):
+    """
+    Loads every table on its own connection as soon as all the tables it references are loaded,
+    so independent tables run side by side and the wall clock follows the longest dependency chain.
+    Each table commits when it finishes so that dependent tables can pass their FK checks against it.
+    tables limits the load to those tables; the others count as already loaded.
+    With options["fast"] the tables have no foreign keys yet, so every table can start straight away.
+    Returns (loaded, failed, skipped).
+    """
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    pending = table_dependencies()
+    if options["fast"]:
+        pending = {table: set() for table in pending}
+    if tables is not None:
+        pending = {table: deps & set(tables) for table, deps in pending.items() if table in tables}
+    loaded = {}
+    failed = {}
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            if not failed:
+                for table in [t for t, deps in pending.items() if deps <= loaded.keys()]:
+                    del pending[table]
+                    running[executor.submit(import_table, folder_name, table, options)] = table
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                table = running.pop(future)
+                try:
+                    loaded[table] = future.result()
+                except Exception as err:
+                    failed[table] = err
+    return loaded, failed, list(pending)
+
+def parse_import_args(args):
+    """
+    import <folder> [chunk_size] [workers] [--validate] [--rejects=DIR] [--incremental] [--checkpoint[=FILE]]
+           [--fast] [--partition-sessions[=YYYY-MM]] [--processes=N]
+    Returns (folder, keyword arguments for import_data).
+    """
+    positional = [arg for arg in args if not arg.startswith("--")]
+    flags = [arg for arg in args if arg.startswith("--")]
+    options = dict(zip(["chunk_size", "workers"], (int(arg) for arg in positional[1:3])))
+    for flag in flags:
+        name, _, value = flag[2:].partition("=")
+        if name == "validate":
+            options["validate"] = True
+        elif name == "rejects":
+            options["validate"] = True
+            options["rejects_dir"] = value
+        elif name == "incremental":
+            options["incremental"] = True
+        elif name == "fast":
+            options["fast"] = True
+        elif name == "processes":
+            options["processes"] = int(value)
+        elif name == "partition-sessions":
+            options["partition_sessions"] = value or True
+        elif name == "checkpoint":
+            options["checkpoint_path"] = value or os.path.join(positional[0], "import.checkpoint")
+        else:
+            raise ValueError(f"unknown import option {flag}")
+    return positional[0], options
+
+def import_data(folder_name, chunk_size=DEFAULT_CHUNK_SIZE, workers=DEFAULT_IMPORT_WORKERS, validate=False,
+                rejects_dir=None, incremental=False, checkpoint_path=None, fast=False, partition_sessions=False,
+                processes=1):
+    """
+    Drops and reloads every table from {table}.csv, .csv.gz, .csv.zst or .parquet in folder_name.
+    With checkpoint_path, tables commit chunk by chunk and progress is kept in that file, so rerunning the same
+    import after a crash or failure resumes instead of starting over; the tables only become final, and the
+    file is removed, once every table has loaded.
+    SECONDARY_INDEXES are built once the rows are in.
+    With fast, tables are created with only their primary keys and loaded with foreign key and unique checks off;
+    the other keys and SECONDARY_INDEXES are added afterwards, one ALTER TABLE per table, followed by an
+    orphan check of every foreign key.
+    With partition_sessions, sessions is range-partitioned by month of initiate_at from that month ("YYYY-MM",
+    or True for DEFAULT_PARTITION_HISTORY_MONTHS back) to DEFAULT_PARTITION_MONTHS_AHEAD months ahead;
+    maintainPartitions keeps it going from there.
+    With processes above 1, a plain .csv of PARALLEL_SPLIT_MIN_BYTES or more is loaded by that many processes
+    at once (see load_parallel); checkpointed imports keep one reader per table.
+    """
+    options = {
+        "chunk_size": chunk_size,
+        "validate": validate,
+        "rejects_dir": rejects_dir or os.path.join(folder_name, "rejects"),
+        "upsert": incremental,
+        "checkpoint": None,
+        "fast": False,
+        "processes": processes,
+    }
+    if incremental:
+        import_delta(folder_name, options, workers)
+        return
+    import input_formats
     conn = connect_db()
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT genres FROM users WHERE uid = %s", (uid,))
-        result = cursor.fetchone()
-        if result is not None:
-            current_genres = result[0]
-            if current_genres:
-                genres_list = [g.strip() for g in current_genres.split(';')]
-                if genre.lower() in [g.lower() for g in genres_list]:
-                    print("Fail")
-                    return
-                updated_genres = current_genres + ";" + genre
-            else:
-                updated_genres = genre
-            cursor.execute("UPDATE users SET genres = %s WHERE uid = %s", (updated_genres, uid))
-            conn.commit()
-            print("Success")
+        checksums = import_checksums(folder_name)
+        settings = {"keep_user_genres": genre_table_enabled(cursor), "fast": fast,
+                    "partition_sessions": partition_sessions}
+        checkpoint = None
+        if checkpoint_path is not None:
+            import import_checkpoint
+            checkpoint = import_checkpoint.Checkpoint(checkpoint_path)
+            # The first run drops user_genres and picks the table layout, so a resumed run keeps its settings.
+            settings = checkpoint.start(checksums, settings)
+            options["checkpoint"] = checkpoint
+        keep_user_genres = settings["keep_user_genres"]
+        options["fast"] = settings["fast"]
+        definitions = dict(TABLE_DEFINITIONS)
+        if settings["partition_sessions"]:
+            definitions["sessions"] = partitioned_sessions_definition(settings["partition_sessions"])
+
+        if checkpoint is not None and checkpoint.resumed:
+            tables = resume_checkpoint(cursor, checkpoint)
         else:
+            tables = None
+            with ForeignKeyChecksOff(cursor):
+                cursor.execute("DROP TABLE IF EXISTS user_genres;")
+                for table in ROLLUP_TABLES:
+                    cursor.execute(f"DROP TABLE IF EXISTS {table};")
+                for table in reversed(list(TABLE_DEFINITIONS)):
+                    cursor.execute(f"DROP TABLE IF EXISTS {table};")
+
+                for table, create_sql in definitions.items():
+                    cursor.execute(deferred_definition(table, create_sql)[0] if options["fast"] else create_sql)
+                for create_sql, _ in ROLLUP_TABLES.values():
+                    cursor.execute(create_sql)
+                # With --fast the parents load alongside sessions, so its parent check waits until they are in.
+                if settings["partition_sessions"] and not options["fast"]:
+                    for trigger_sql in SESSIONS_CHECK_TRIGGERS:
+                        cursor.execute(trigger_sql)
+        options["local_infile"] = local_infile_enabled(cursor)
+        loaded, failed, skipped = schedule_import(folder_name, options, workers, tables)
+
+        if failed and checkpoint is not None:
+            # Committed chunks stay so that the next run resumes from them.
+            for table, err in failed.items():
+                print(f"{table}: failed ({err})", file=sys.stderr)
+            for table in skipped:
+                print(f"{table}: skipped", file=sys.stderr)
+            print(f"import stopped; rerun it to resume from {checkpoint.path}", file=sys.stderr)
+            print("Fail")
+            return
+
+        if failed:
+            # Tables commit individually, so undo the ones that finished to keep the import all-or-nothing.
+            # Failed tables are emptied too: a table split across processes commits each range on its own.
+            with ForeignKeyChecksOff(cursor):
+                for table in list(loaded) + list(failed):
+                    cursor.execute(f"TRUNCATE TABLE {table};")
+            for table, err in failed.items():
+                print(f"{table}: failed ({err})", file=sys.stderr)
+            for table in skipped:
+                print(f"{table}: skipped", file=sys.stderr)
+            for table in loaded:
+                print(f"{table}: rolled back", file=sys.stderr)
+            print("Fail")
+            return
+
+        if checkpoint is not None:
+            loaded = {table: checkpoint.table(table)["rows"] for table in TABLE_DEFINITIONS}
+        problems = add_deferred_constraints(cursor, definitions) if options["fast"] else []
+        if settings["partition_sessions"]:
+            # With --fast the sid trigger is only created below, and without it the trigger cannot see rows
+            # that other connections have not committed yet (--processes), so duplicates are looked for here.
+            problems += duplicate_session_problems(cursor)
+        if problems:
+            with ForeignKeyChecksOff(cursor):
+                for table in TABLE_DEFINITIONS:
+                    cursor.execute(f"TRUNCATE TABLE {table};")
+            if checkpoint is not None:
+                checkpoint.remove()
+            for problem in problems:
+                print(problem, file=sys.stderr)
             print("Fail")
+            return
+        if not options["fast"]:
+            add_secondary_indexes(cursor)
+        elif settings["partition_sessions"]:
+            for trigger_sql in SESSIONS_CHECK_TRIGGERS:
+                cursor.execute(trigger_sql)
+        for table, (_, build_sql) in ROLLUP_TABLES.items():
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(build_sql)
+        # Delete lists are not applied by a full import, so they are not recorded as applied either.
+        cursor.execute(IMPORT_STATE_DEFINITION)
+        cursor.execute("DELETE FROM import_state")
+        record_import_state(cursor, {name: checksum for name, checksum in checksums.items()
+                                     if ".deletes." not in name},
+                            {input_formats.find_input(folder_name, table): rows for table, rows in loaded.items()})
+        conn.commit()
+        if keep_user_genres:
+            cursor.execute("DROP TABLE IF EXISTS user_genres")
+            cursor.execute(USER_GENRES_DEFINITION)
+            cursor.execute(SYNC_ALL_USER_GENRES_SQL)
+            conn.commit()
+        if checkpoint is not None:
+            checkpoint.remove()
+        print("Success")
     except mysql.connector.Error as err:
         conn.rollback()
         print("Fail", err)
@@ -195,13 +970,190 @@ def add_genre(uid, genre):
         cursor.close()
         conn.close()
 
-def delete_viewer(uid):
+def resume_checkpoint(cursor, checkpoint):
+    """
+    Returns the tables still to load. A table whose row count differs from its checkpoint died between the
+    commit and the checkpoint write, so it is emptied and loaded again from its first line.
+    Its dependents have not started yet (they wait for it to finish), so emptying it cannot orphan rows.
+    """
+    tables = [table for table in TABLE_DEFINITIONS if not checkpoint.table(table)["done"]]
+    with ForeignKeyChecksOff(cursor):
+        for table in tables:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            if cursor.fetchone()[0] != checkpoint.table(table)["rows"]:
+                cursor.execute(f"TRUNCATE TABLE {table};")
+                checkpoint.reset(table)
+    for table in TABLE_DEFINITIONS:
+        if table not in tables:
+            print(f"{table}: already loaded", file=sys.stderr)
+        elif checkpoint.table(table)["line"] > 1:
+            print(f"{table}: resuming after line {checkpoint.table(table)['line']}", file=sys.stderr)
+    return tables
+
+# Rollup keys that rows of a table can affect, looked up before import --incremental changes them:
+# table -> [("rid" or "day_uid", query over the table's primary key values, for {keys} placeholders)].
+CHANGED_ROW_ROLLUP_KEYS = {
+    "reviews": [("rid", "SELECT DISTINCT rid FROM reviews WHERE rvid IN ({keys})")],
+    "sessions": [("day_uid", "SELECT DISTINCT DATE(initiate_at), uid FROM sessions WHERE sid IN ({keys})")],
+}
+# The same for deleted parent rows, whose reviews and sessions go with them (ON DELETE CASCADE).
+# A deleted viewer's own viewer_daily_sessions and a deleted release's release_stats rows cascade by themselves.
+DELETED_ROW_ROLLUP_KEYS = {
+    "users": [("rid", "SELECT DISTINCT rid FROM reviews WHERE uid IN ({keys})"),
+              ("day_uid", """SELECT DISTINCT DATE(s.initiate_at), s.uid FROM sessions s
+                             JOIN releases r ON s.rid = r.rid WHERE r.producer_uid IN ({keys})""")],
+    "viewers": [("rid", "SELECT DISTINCT rid FROM reviews WHERE uid IN ({keys})")],
+    "producers": [("day_uid", """SELECT DISTINCT DATE(s.initiate_at), s.uid FROM sessions s
+                                 JOIN releases r ON s.rid = r.rid WHERE r.producer_uid IN ({keys})""")],
+    "releases": [("day_uid", "SELECT DISTINCT DATE(initiate_at), uid FROM sessions WHERE rid IN ({keys})")],
+    "videos": [("day_uid", "SELECT DISTINCT DATE(initiate_at), uid FROM sessions WHERE rid IN ({keys})")],
+}
+ROLLUP_KEY_GROUP = 1000
+
+def key_groups(keys, size=ROLLUP_KEY_GROUP):
+    keys = sorted(keys)
+    for offset in range(0, len(keys), size):
+        yield keys[offset:offset + size]
+
+def file_rows(csv_path):
+    import input_formats
+    with input_formats.open_rows(csv_path) as csv_reader:
+        next(csv_reader, None)
+        yield from csv_reader
+
+def file_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def day_uid(initiate_at, uid):
+    """
+    (date, uid) for a sessions row from a file, or None when either is missing or unreadable.
+    """
+    from datetime import date
+    try:
+        return date.fromisoformat(initiate_at[:10]), int(uid)
+    except (TypeError, ValueError):
+        return None
+
+def rollup_keys(cursor, delete_paths, upsert_paths):
+    """
+    Before import_delta changes anything, collects what its delete lists and upserts ({table: path} each) can
+    change: the release_stats rids, the viewer_daily_sessions (day, uid) pairs and the uids whose user_genres
+    rows follow users.genres. Rows that are about to be replaced or deleted are looked up as they stand now,
+    since an upsert can move a review to another rid or a session to another day.
+    Returns {"rid": set, "day_uid": set, "uid": set}.
+    """
+    import csv_validation
+    keys = {"rid": set(), "day_uid": set(), "uid": set()}
+    lookups = []
+    for table, csv_path in delete_paths.items():
+        table_keys = {file_int(row[0]) for row in file_rows(csv_path) if row}
+        lookups += [(kind, sql, table_keys)
+                    for kind, sql in CHANGED_ROW_ROLLUP_KEYS.get(table, []) + DELETED_ROW_ROLLUP_KEYS.get(table, [])]
+    for table, csv_path in upsert_paths.items():
+        columns = [spec[0] for spec in csv_validation.column_specs(TABLE_DEFINITIONS[table])]
+        table_keys = set()
+        for row in file_rows(csv_path):
+            fields = dict(zip(columns, row))
+            table_keys.add(file_int(row[0]) if row else None)
+            if table in ("reviews", "releases"):
+                keys["rid"].add(file_int(fields.get("rid")))
+            elif table == "sessions":
+                keys["day_uid"].add(day_uid(fields.get("initiate_at"), fields.get("uid")))
+            elif table == "users":
+                keys["uid"].add(file_int(fields.get("uid")))
+        lookups += [(kind, sql, table_keys) for kind, sql in CHANGED_ROW_ROLLUP_KEYS.get(table, [])]
+    for kind, sql, table_keys in lookups:
+        for group in key_groups(table_keys - {None}):
+            cursor.execute(sql.format(keys=", ".join(["%s"] * len(group))), group)
+            for row in cursor.fetchall():
+                keys[kind].add(row[0] if kind == "rid" else day_uid(str(row[0]), row[1]))
+    for kind in keys:
+        keys[kind] = {key for key in keys[kind] if key is not None and (kind != "day_uid" or None not in key)}
+    return keys
+
+def refresh_rollups(cursor, keys):
+    """
+    Recounts only the rollup and user_genres rows named by rollup_keys, now that the changes are in.
+    """
+    for group in key_groups(keys["rid"]):
+        placeholders = ", ".join(["%s"] * len(group))
+        cursor.execute(f"DELETE FROM release_stats WHERE rid IN ({placeholders})", group)
+        cursor.execute(RELEASE_STATS_ROWS_SQL.format(release_filter=f"WHERE r.rid IN ({placeholders})"), group)
+    for group in key_groups(keys["day_uid"]):
+        pairs = ", ".join(["(%s, %s)"] * len(group))
+        pair_values = [value for pair in group for value in pair]
+        uids = sorted({uid for _, uid in group})
+        cursor.execute(f"DELETE FROM viewer_daily_sessions WHERE (day, uid) IN ({pairs})", pair_values)
+        cursor.execute(VIEWER_DAILY_SESSIONS_ROWS_SQL.format(
+            session_filter=f"AND uid IN ({', '.join(['%s'] * len(uids))}) AND (DATE(initiate_at), uid) IN ({pairs})"),
+            uids + pair_values)
+    if keys["uid"] and genre_table_enabled(cursor):
+        for group in key_groups(keys["uid"]):
+            placeholders = ", ".join(["%s"] * len(group))
+            cursor.execute(f"DELETE FROM user_genres WHERE uid IN ({placeholders})", group)
+            cursor.execute(SYNC_USER_GENRES_SQL.format(user_filter=f"AND uid IN ({placeholders})"), group)
+
+def import_delta(folder_name, options, workers):
+    """
+    Applies only the files whose checksum differs from the one recorded by the last import:
+    {table}.deletes files first (children before parents), then {table} files as upserts.
+    Tables and rollups stay in place, so the work follows the size of the change rather than of the history:
+    only the rollup and user_genres rows for the keys in the applied files are recounted (see rollup_keys).
+    Each file is recorded once it is committed, so after a failure a rerun picks up the rest.
+    """
+    import input_formats
     conn = connect_db()
     cursor = conn.cursor()
     try:
-        cursor.execute("DELETE FROM viewers WHERE uid = %s", (uid,))
-        cursor.execute("DELETE FROM users WHERE uid = %s", (uid,))
+        cursor.execute(IMPORT_STATE_DEFINITION)
+        cursor.execute("SELECT file_name, checksum FROM import_state")
+        applied = dict(cursor.fetchall())
+        checksums = {name: checksum for name, checksum in import_checksums(folder_name).items()
+                     if applied.get(name) != checksum}
+        delete_files = {table: input_formats.find_input(folder_name, f"{table}.deletes") for table in TABLE_DEFINITIONS}
+        upsert_files = {table: input_formats.find_input(folder_name, table) for table in TABLE_DEFINITIONS}
+        delete_tables = [table for table in reversed(list(TABLE_DEFINITIONS)) if delete_files[table] in checksums]
+        upsert_tables = [table for table in TABLE_DEFINITIONS if upsert_files[table] in checksums]
+        for table in TABLE_DEFINITIONS:
+            if table not in delete_tables and table not in upsert_tables:
+                print(f"{table}: unchanged", file=sys.stderr)
+
+        delete_keys = rollup_keys(cursor, {table: os.path.join(folder_name, delete_files[table])
+                                           for table in delete_tables}, {})
+        deleted = {}
+        for table in delete_tables:
+            deleted[delete_files[table]] = delete_rows(
+                cursor, table, os.path.join(folder_name, delete_files[table]), options["chunk_size"])
+        if set(delete_tables) - {"sessions"} and session_partitions(cursor):
+            # Partitioned sessions has no foreign keys to cascade from the parents just deleted.
+            for columns, parent, parent_columns in foreign_keys("sessions"):
+                cursor.execute(orphan_rows_sql("sessions", columns, parent, parent_columns, "DELETE c"))
+        refresh_rollups(cursor, delete_keys)
+        record_import_state(cursor, {name: checksums[name] for name in deleted}, deleted)
+        conn.commit()
+
+        upsert_keys = rollup_keys(cursor, {}, {table: os.path.join(folder_name, upsert_files[table])
+                                               for table in upsert_tables})
+        # Ends this connection's read view, so the recount below sees what the import connections commit.
         conn.commit()
+        loaded, failed, skipped = schedule_import(folder_name, dict(options, local_infile=False), workers,
+                                                  upsert_tables)
+        # Failed tables are recounted too: a table split across processes commits each range on its own.
+        refresh_rollups(cursor, upsert_keys)
+        record_import_state(cursor, {upsert_files[table]: checksums[upsert_files[table]] for table in loaded},
+                            {upsert_files[table]: rows for table, rows in loaded.items()})
+        conn.commit()
+
+        if failed:
+            for table, err in failed.items():
+                print(f"{table}: failed ({err})", file=sys.stderr)
+            for table in skipped:
+                print(f"{table}: skipped", file=sys.stderr)
+            print("Fail")
+            return
         print("Success")
     except mysql.connector.Error as err:
         conn.rollback()
@@ -210,12 +1162,30 @@ def delete_viewer(uid):
         cursor.close()
         conn.close()
 
-def insert_movie(rid, website_url):
+normalized_genres = None
+
+def genre_table_enabled(cursor):
+    global normalized_genres
+    if normalized_genres is None:
+        cursor.execute("SHOW TABLES LIKE 'user_genres'")
+        normalized_genres = cursor.fetchone() is not None
+    return normalized_genres
+
+def migrate_genres():
+    """
+    Creates user_genres (if needed) and fills it from the semicolon-delimited users.genres strings.
+    Duplicate genres within one user's string collapse to one row.
+    """
+    global normalized_genres
     conn = connect_db()
     cursor = conn.cursor()
     try:
-        cursor.execute("INSERT INTO movies (rid, website_url) VALUES (%s, %s)", (rid, website_url))
+        cursor.execute("SHOW TABLES LIKE 'user_genres'")
+        if cursor.fetchone() is None:
+            cursor.execute(USER_GENRES_DEFINITION)
+        cursor.execute(SYNC_ALL_USER_GENRES_SQL)
         conn.commit()
+        normalized_genres = True
         print("Success")
     except mysql.connector.Error as err:
         conn.rollback()
@@ -224,28 +1194,378 @@ def insert_movie(rid, website_url):
         cursor.close()
         conn.close()
 
+INSERT_USER_SQL = """
+    INSERT INTO users (uid, email, joined_date, nickname, street, city, state, `zip`, genres)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+INSERT_VIEWER_SQL = """
+    INSERT INTO viewers (uid, subscription, first_name, last_name)
+    VALUES (%s, %s, %s, %s)
+"""
+INSERT_MOVIE_SQL = "INSERT INTO movies (rid, website_url) VALUES (%s, %s)"
+INSERT_SESSION_SQL = """
+    INSERT INTO sessions (sid, uid, rid, ep_num, initiate_at, leave_at, quality, device)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+COUNT_DAILY_SESSION_SQL = """
+    INSERT INTO viewer_daily_sessions (day, uid, session_count)
+    VALUES (DATE(%s), %s, 1)
+    ON DUPLICATE KEY UPDATE session_count = session_count + 1
+"""
+
+def insert_viewer(uid, email, nickname, street, city, state, zip_code, genres, joined_date, first_name, last_name, subscription):
+    """
+    Inserts a new viewer.
+    Command order: uid, email, nickname, street, city, state, zip, genres, joined_date, first_name, last_name, subscription
+    Note: Users table requires order: uid, email, joined_date, nickname, street, city, state, `zip`, genres
+    """
+    import api
+    try:
+        api.Client().insert_viewer(uid, email, nickname, street, city, state, zip_code, genres, joined_date,
+                                   first_name, last_name, subscription)
+        print("Success")
+    except api.CommandFailed:
+        print("Fail")
+
+def add_genre(uid, genre):
+    import api
+    try:
+        api.Client().add_genre(uid, genre)
+        print("Success")
+    except (api.NotFound, api.Duplicate):
+        print("Fail")
+    except api.CommandFailed as err:
+        print("Fail", err)
+
+INSERT_USER_GENRE_SQL = "INSERT INTO user_genres (uid, genre) VALUES (%s, %s)"
+APPEND_USER_GENRE_SQL = """
+    UPDATE users
+    SET genres = IF(genres IS NULL OR genres = '', %s, CONCAT(genres, ';', %s))
+    WHERE uid = %s
+"""
+USER_GENRES_SQL = "SELECT genres FROM users WHERE uid = %s"
+SET_USER_GENRES_SQL = "UPDATE users SET genres = %s WHERE uid = %s"
+
+def add_genre_normalized(cursor, uid, genre, conn=None):
+    """
+    The unique (uid, LOWER(genre)) index rejects duplicates and the FK rejects unknown users,
+    both as IntegrityError; users.genres is appended to in SQL without reading it back.
+    """
+    execute_statement(conn, cursor, INSERT_USER_GENRE_SQL, (uid, genre))
+    execute_statement(conn, cursor, APPEND_USER_GENRE_SQL, (genre, genre, uid))
+
+REMOVE_VIEWER_REVIEW_STATS_SQL = """
+    UPDATE release_stats rs
+    JOIN (
+        SELECT rid, COUNT(*) AS review_count
+        FROM reviews
+        WHERE uid = %s AND rid IS NOT NULL
+        GROUP BY rid
+    ) removed ON rs.rid = removed.rid
+    SET rs.review_count = rs.review_count - removed.review_count
+"""
+
+def delete_viewer(uid):
+    import api
+    try:
+        api.Client().delete_viewer(uid)
+        print("Success")
+    except api.CommandFailed as err:
+        print("Fail", err)
+
+DEFAULT_PURGE_BATCH_SIZE = 5000
+PURGE_UID_GROUP = 100
+
+def delete_viewers(uids, batch_size=DEFAULT_PURGE_BATCH_SIZE, pause_ms=0):
+    """
+    Bulk deleteViewer for purges; see api.Client.delete_viewers. Progress goes to stderr after every uid group,
+    so a failed run shows how far it got (the viewers before that point stay deleted).
+    """
+    import api
+    total = len(uids)
+
+    def report(done, deleted):
+        print(f"deleteViewers: {done}/{total} viewers, {deleted['sessions']} sessions, "
+              f"{deleted['reviews']} reviews deleted", file=sys.stderr)
+
+    try:
+        api.Client().delete_viewers(uids, batch_size, pause_ms / 1000, report)
+        print("Success")
+    except api.CommandFailed as err:
+        print("Fail", err)
+
+def delete_viewers_command(args):
+    """
+    deleteViewers <uid>... [--file=PATH] [--batch=N] [--pause-ms=N]
+    The file holds one uid per line (a CSV's first column works; a non-numeric header line is skipped).
+    """
+    uids = [int(arg) for arg in args if not arg.startswith("--")]
+    options = {}
+    for flag in (arg for arg in args if arg.startswith("--")):
+        name, _, value = flag[2:].partition("=")
+        if name == "file":
+            with open(value, 'r') as uid_file:
+                for line in uid_file:
+                    field = line.split(",", 1)[0].strip()
+                    if field.isdigit():
+                        uids.append(int(field))
+        elif name == "batch":
+            options["batch_size"] = int(value)
+        elif name == "pause-ms":
+            options["pause_ms"] = int(value)
+        else:
+            raise ValueError(f"unknown deleteViewers option {flag}")
+    delete_viewers(uids, **options)
+
+def insert_movie(rid, website_url):
+    import api
+    try:
+        api.Client().insert_movie(rid, website_url)
+        print("Success")
+    except api.CommandFailed as err:
+        print("Fail", err)
+
 def insert_session(sid, uid, rid, ep_num, initiate_at, leave_at, quality, device):
+    import api
+    try:
+        api.Client().insert_session(sid, uid, rid, ep_num, initiate_at, leave_at, quality, device)
+        print("Success")
+    except api.CommandFailed:
+        print("Fail")
+
+def update_release(rid, title):
+    import api
+    try:
+        api.Client().update_release(rid, title)
+        print("Success")
+    except api.CommandFailed as err:
+        print("Fail", err)
+
+LIST_RELEASES_SQL = """
+    SELECT DISTINCT r.rid, r.genre, r.title
+    FROM releases r
+    JOIN reviews rev ON r.rid = rev.rid
+    WHERE rev.uid = %s
+    ORDER BY r.title ASC
+"""
+POPULAR_RELEASE_SQL = """
+    SELECT r.rid, r.title, rs.review_count AS reviewCount
+    FROM release_stats rs
+    JOIN releases r ON r.rid = rs.rid
+    ORDER BY rs.review_count DESC, rs.rid DESC
+    LIMIT %s
+"""
+RELEASE_TITLE_SQL = """
+    SELECT r.rid, r.title AS release_title, r.genre, v.title AS video_title, v.ep_num, v.length
+    FROM sessions s
+    JOIN releases r ON s.rid = r.rid
+    JOIN videos v ON s.rid = v.rid AND s.ep_num = v.ep_num
+    WHERE s.sid = %s
+    ORDER BY r.title ASC
+"""
+ACTIVE_VIEWER_SQL = """
+    SELECT viewer.uid, viewer.first_name, viewer.last_name
+    FROM viewers viewer
+    JOIN sessions session ON viewer.uid = session.uid
+    WHERE session.initiate_at BETWEEN %s AND %s
+    GROUP BY viewer.uid, viewer.first_name, viewer.last_name
+    HAVING COUNT(session.sid) >= %s
+    ORDER BY viewer.uid ASC
+"""
+# Same result as ACTIVE_VIEWER_SQL: whole days come from viewer_daily_sessions, the partial days at either
+# edge of the window are counted from sessions directly.
+ACTIVE_VIEWER_ROLLUP_SQL = """
+    SELECT viewer.uid, viewer.first_name, viewer.last_name
+    FROM viewers viewer
+    JOIN (
+        SELECT uid, SUM(session_count) AS session_count
+        FROM (
+            SELECT uid, session_count
+            FROM viewer_daily_sessions
+            WHERE day >= %s AND day < %s
+            UNION ALL
+            SELECT uid, COUNT(*)
+            FROM sessions
+            WHERE initiate_at >= %s AND initiate_at < %s
+            GROUP BY uid
+            UNION ALL
+            SELECT uid, COUNT(*)
+            FROM sessions
+            WHERE initiate_at >= %s AND initiate_at <= %s
+            GROUP BY uid
+        ) parts
+        GROUP BY uid
+    ) counted ON viewer.uid = counted.uid
+    WHERE counted.session_count > 0 AND counted.session_count >= %s
+    ORDER BY viewer.uid ASC
+"""
+# Per-release distinct-viewer count joined onto each of the release's episodes in one round trip.
+VIDEOS_VIEWED_SQL = """
+    SELECT v.rid, v.ep_num, v.title, v.length, counted.viewer_count
+    FROM videos v
+    CROSS JOIN (
+        SELECT COUNT(DISTINCT s.uid) AS viewer_count
+        FROM sessions s
+        WHERE s.rid = %s
+    ) counted
+    WHERE v.rid = %s
+    ORDER BY v.ep_num ASC
+"""
+# Multi-release form: {rid_filter} is either "BETWEEN %s AND %s" or "IN (%s, ...)" and is applied to both sides.
+VIDEOS_VIEWED_MANY_SQL = """
+    SELECT v.rid, v.ep_num, v.title, v.length, COALESCE(counted.viewer_count, 0)
+    FROM videos v
+    LEFT JOIN (
+        SELECT s.rid, COUNT(DISTINCT s.uid) AS viewer_count
+        FROM sessions s
+        WHERE s.rid {rid_filter}
+        GROUP BY s.rid
+    ) counted ON v.rid = counted.rid
+    WHERE v.rid {rid_filter}
+    ORDER BY v.rid ASC, v.ep_num ASC
+"""
+
+# Covering indexes for the analytical queries: (table, index name, columns)
+SECONDARY_INDEXES = [
+    ("sessions", "idx_sessions_initiate_uid", "initiate_at, uid"),
+    ("sessions", "idx_sessions_rid_uid", "rid, uid"),
+    ("reviews", "idx_reviews_uid_rid", "uid, rid"),
+]
+
+# Query commands checked by ensureIndexes: name -> (sql, sample parameters for EXPLAIN)
+EXPLAIN_QUERIES = {
+    "listReleases": (LIST_RELEASES_SQL, (1,)),
+    "popularRelease": (POPULAR_RELEASE_SQL, (10,)),
+    "releaseTitle": (RELEASE_TITLE_SQL, (1,)),
+    "activeViewer": (ACTIVE_VIEWER_SQL, ("2024-01-01", "2024-01-31", 1)),
+    "activeViewer (rollup)": (ACTIVE_VIEWER_ROLLUP_SQL, ("2024-01-01", "2024-01-31",
+                                                         "2024-01-01", "2024-01-01",
+                                                         "2024-01-31", "2024-01-31", 1)),
+    "videosViewed": (VIDEOS_VIEWED_SQL, (1, 1)),
+    "videosViewed (range)": (VIDEOS_VIEWED_MANY_SQL.format(rid_filter="BETWEEN %s AND %s"), (1, 100, 1, 100)),
+}
+
+def ensure_indexes():
+    """
+    Creates any missing SECONDARY_INDEXES, then EXPLAINs every query command and prints the ones
+    that still read a whole table. import builds the indexes after loading, so this only has to repair
+    databases imported before it did.
+    """
     conn = connect_db()
     cursor = conn.cursor()
     try:
-        cursor.execute("""
-            INSERT INTO sessions (sid, uid, rid, ep_num, initiate_at, leave_at, quality, device)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """, (sid, uid, rid, ep_num, initiate_at, leave_at, quality, device))
-        conn.commit()
+        for table, index_name, columns in SECONDARY_INDEXES:
+            cursor.execute("""
+                SELECT 1 FROM information_schema.statistics
+                WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+                LIMIT 1
+            """, (table, index_name))
+            if cursor.fetchone() is None:
+                cursor.execute(f"CREATE INDEX {index_name} ON {table} ({columns})")
+                print(f"Created {index_name} on {table} ({columns})")
+
+        for name, (sql, params) in EXPLAIN_QUERIES.items():
+            cursor.execute("EXPLAIN " + sql, params)
+            plan_columns = cursor.column_names
+            for plan_row in cursor.fetchall():
+                step = dict(zip(plan_columns, plan_row))
+                if step.get("type") == "ALL":
+                    print(f"{name}: full scan of {step.get('table')} (~{step.get('rows')} rows)")
         print("Success")
     except mysql.connector.Error as err:
-        conn.rollback()
-        print("Fail")
+        print("Fail", err)
     finally:
         cursor.close()
         conn.close()
 
-def update_release(rid, title):
+def add_months(month, months):
+    from datetime import date
+    year, month_index = divmod(month.year * 12 + month.month - 1 + months, 12)
+    return date(year, month_index + 1, 1)
+
+def month_partition_sql(month):
+    return f"PARTITION p{month:%Y%m} VALUES LESS THAN ('{add_months(month, 1)}')"
+
+def partitioned_sessions_definition(first_month, months_ahead=DEFAULT_PARTITION_MONTHS_AHEAD):
+    """
+    PARTITIONED_SESSIONS_DEFINITION with p_before for rows older than first_month ("YYYY-MM", or True for
+    DEFAULT_PARTITION_HISTORY_MONTHS ago), one partition per month up to months_ahead from now, and p_future.
+    """
+    from datetime import date
+    this_month = date.today().replace(day=1)
+    if first_month is True:
+        month = add_months(this_month, -DEFAULT_PARTITION_HISTORY_MONTHS)
+    else:
+        month = date.fromisoformat(first_month + "-01")
+    partitions = [f"PARTITION p_before VALUES LESS THAN ('{month}')"]
+    while month <= add_months(this_month, months_ahead):
+        partitions.append(month_partition_sql(month))
+        month = add_months(month, 1)
+    partitions.append("PARTITION p_future VALUES LESS THAN (MAXVALUE)")
+    return PARTITIONED_SESSIONS_DEFINITION.format(partitions=",\n        ".join(partitions))
+
+def session_partitions(cursor):
+    """
+    [(partition name, upper bound date or None for MAXVALUE), ...] in order; empty when sessions is not partitioned.
+    """
+    from datetime import date
+    cursor.execute("""
+        SELECT partition_name, partition_description FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = 'sessions' AND partition_name IS NOT NULL
+        ORDER BY partition_ordinal_position
+    """)
+    return [(name, None if bound == "MAXVALUE" else date.fromisoformat(bound.strip("'")[:10]))
+            for name, bound in cursor.fetchall()]
+
+def maintain_partitions(months_ahead=DEFAULT_PARTITION_MONTHS_AHEAD, retention_months=None, archive=False):
+    """
+    Splits p_future so every month up to months_ahead from now has its own sessions partition.
+    With retention_months, partitions that end before the start of the month that many months ago are dropped
+    (p_before is truncated), after being swapped out into an empty sessions_archive_* table when archive is set.
+    Both are metadata operations on sessions; viewer_daily_sessions loses the same days with a DELETE.
+    """
+    from datetime import date
     conn = connect_db()
     cursor = conn.cursor()
     try:
-        cursor.execute("UPDATE releases SET title = %s WHERE rid = %s", (title, rid))
+        partitions = session_partitions(cursor)
+        if not partitions:
+            print("Fail", "sessions is not partitioned; import with --partition-sessions")
+            return
+        this_month = date.today().replace(day=1)
+        month = max(bound for _, bound in partitions if bound is not None)
+        new_partitions = []
+        while month <= add_months(this_month, months_ahead):
+            new_partitions.append(month_partition_sql(month))
+            month = add_months(month, 1)
+        if new_partitions:
+            cursor.execute(f"""
+                ALTER TABLE sessions REORGANIZE PARTITION p_future INTO (
+                    {", ".join(new_partitions)}, PARTITION p_future VALUES LESS THAN (MAXVALUE)
+                )
+            """)
+            print(f"Added {len(new_partitions)} partitions up to {add_months(month, -1):%Y-%m}")
+
+        if retention_months is not None:
+            cutoff = add_months(this_month, -retention_months)
+            for name, bound in partitions:
+                if bound is None or bound > cutoff:
+                    continue
+                cursor.execute(f"SELECT 1 FROM sessions PARTITION ({name}) LIMIT 1")
+                if archive and cursor.fetchall():
+                    archive_table = f"sessions_archive_{name}"
+                    if name == "p_before":
+                        archive_table = f"sessions_archive_before_{cutoff:%Y%m}"
+                    cursor.execute(f"CREATE TABLE {archive_table} LIKE sessions")
+                    cursor.execute(f"ALTER TABLE {archive_table} REMOVE PARTITIONING")
+                    cursor.execute(f"ALTER TABLE sessions EXCHANGE PARTITION {name} WITH TABLE {archive_table}")
+                    print(f"Archived {name} to {archive_table}")
+                if name == "p_before":
+                    cursor.execute("ALTER TABLE sessions TRUNCATE PARTITION p_before")
+                else:
+                    cursor.execute(f"ALTER TABLE sessions DROP PARTITION {name}")
+                    print(f"Dropped {name}")
+            cursor.execute("DELETE FROM viewer_daily_sessions WHERE day < %s", (cutoff,))
         conn.commit()
         print("Success")
     except mysql.connector.Error as err:
@@ -255,168 +1575,512 @@ def update_release(rid, title):
         cursor.close()
         conn.close()
 
-def list_releases(uid):
+def maintain_partitions_command(args):
+    """
+    maintainPartitions [months_ahead] [retention_months] [--archive]
+    """
+    numbers = [int(arg) for arg in args if not arg.startswith("--")]
+    maintain_partitions(*numbers[:2], archive="--archive" in args)
+
+def statement_stats():
+    """
+    Prints how often each registry statement was prepared and reused in this process (repl or batch mode).
+    """
+    if statement_registry is None:
+        print("Fail", "prepared statements are only used in repl and batch mode")
+        return
+    prepared, reused, per_statement = statement_registry.stats()
+    total = prepared + reused
+    print(f"{prepared} prepared, {reused} reused, hit rate {reused / total if total else 0:.1%}")
+    for sql, statement_prepared, statement_reused in per_statement:
+        print(f"{statement_prepared} prepared, {statement_reused} reused: {' '.join(sql.split())[:80]}")
+
+rollups_ready = False
+
+def ensure_rollups(cursor):
+    """
+    Creates and fills any missing ROLLUP_TABLES, for databases imported before they existed; the commands that
+    read or maintain them call this first. Checked once per process. CREATE TABLE commits, so call it before a
+    transaction does any work; returns whether anything was built, which the caller must then commit.
+    """
+    global rollups_ready
+    built = False
+    if not rollups_ready:
+        for table, (create_sql, build_sql) in ROLLUP_TABLES.items():
+            cursor.execute("SHOW TABLES LIKE %s", (table,))
+            if cursor.fetchone() is None:
+                cursor.execute(create_sql)
+                cursor.execute(build_sql)
+                built = True
+        rollups_ready = True
+    return built
+
+def rebuild_rollups():
     conn = connect_db()
     cursor = conn.cursor()
     try:
-        cursor.execute("""
-            SELECT DISTINCT r.rid, r.genre, r.title
-            FROM releases r
-            JOIN reviews rev ON r.rid = rev.rid
-            WHERE rev.uid = %s
-            ORDER BY r.title ASC
-        """, (uid,))
-        results = cursor.fetchall()
-        for row in results:
-            print(",".join(str(item) if item is not None else "NULL" for item in row))
+        for table, (create_sql, build_sql) in ROLLUP_TABLES.items():
+            cursor.execute("SHOW TABLES LIKE %s", (table,))
+            if cursor.fetchone() is None:
+                cursor.execute(create_sql)
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(build_sql)
+        conn.commit()
+        print("Success")
     except mysql.connector.Error as err:
-        pass
+        conn.rollback()
+        print("Fail", err)
     finally:
         cursor.close()
         conn.close()
 
+STREAM_CHUNK_SIZE = 1000
+
+def format_row(row):
+    return ",".join(str(item) if item is not None else "NULL" for item in row)
+
+def write_chunks(chunks):
+    """
+    Prints streamed row chunks with one stdout write per chunk; returns the number of rows written.
+    """
+    written = 0
+    for rows in chunks:
+        sys.stdout.write("".join(format_row(row) + "\n" for row in rows))
+        written += len(rows)
+    return written
+
+# The query commands return whether they succeeded, so that run_cached only stores good output.
+
+def list_releases(uid):
+    import api
+    try:
+        write_chunks(api.Client().list_releases(uid, stream=True))
+        return True
+    except api.CommandFailed as err:
+        print("Fail", err)
+        return False
+
 def popular_release(n):
-    conn = connect_db()
-    cursor = conn.cursor()
+    import api
     try:
-        cursor.execute("""
-            SELECT r.rid, r.title, COUNT(rev.rid) as reviewCount
-            FROM releases r
-            LEFT JOIN reviews rev ON r.rid = rev.rid
-            GROUP BY r.rid, r.title
-            ORDER BY reviewCount DESC, r.rid DESC
-            LIMIT %s
-        """, (n,))
-        results = cursor.fetchall()
-        for row in results:
-            print(",".join(str(item) if item is not None else "NULL" for item in row))
-    except mysql.connector.Error as err:
-        pass
-    finally:
-        cursor.close()
-        conn.close()
+        write_chunks(api.Client().popular_release(n, stream=True))
+        return True
+    except api.CommandFailed as err:
+        print("Fail", err)
+        return False
 
 def release_title(sid):
-    conn = connect_db()
-    cursor = conn.cursor()
+    import api
     try:
-        cursor.execute("""
-            SELECT r.rid, r.title AS release_title, r.genre, v.title AS video_title, v.ep_num, v.length
-            FROM sessions s
-            JOIN releases r ON s.rid = r.rid
-            JOIN videos v ON s.rid = v.rid AND s.ep_num = v.ep_num
-            WHERE s.sid = %s
-            ORDER BY r.title ASC
-        """, (sid,))
-        results = cursor.fetchall()
-        if results:
-            for row in results:
-                print(",".join(str(item) if item is not None else "NULL" for item in row))
-        else:
+        if not write_chunks(api.Client().release_title(sid, stream=True)):
             print("Fail")
-    except mysql.connector.Error as err:
+            return False
+        return True
+    except api.CommandFailed as err:
         print("Fail", err)
-    finally:
-        cursor.close()
-        conn.close()
+        return False
+
+def active_viewer_query(minimum_sessions, start_date, end_date):
+    """
+    Picks the rollup query when [start_date, end_date] covers at least one whole day, else the raw query.
+    Whole days run from start rounded up to midnight until (end + 1s) rounded down to midnight,
+    since BETWEEN includes end_date itself.
+    """
+    from datetime import datetime, timedelta
+    try:
+        window_start = datetime.fromisoformat(start_date)
+        window_end = datetime.fromisoformat(end_date)
+    except ValueError:
+        return ACTIVE_VIEWER_SQL, (start_date, end_date, minimum_sessions)
+    first_day = datetime.combine(window_start.date(), datetime.min.time())
+    if first_day < window_start:
+        first_day += timedelta(days=1)
+    end_day = datetime.combine((window_end + timedelta(seconds=1)).date(), datetime.min.time())
+    if first_day >= end_day:
+        return ACTIVE_VIEWER_SQL, (start_date, end_date, minimum_sessions)
+    return ACTIVE_VIEWER_ROLLUP_SQL, (first_day.date(), end_day.date(),
+                                      window_start, first_day,
+                                      end_day, window_end,
+                                      minimum_sessions)
 
 def active_viewer(minimum_sessions, start_date, end_date):
-    database_connection = connect_db()
-    database_cursor = database_connection.cursor()
-    active_users_list = []
+    import api
+    try:
+        write_chunks(api.Client().active_viewer(minimum_sessions, start_date, end_date, stream=True))
+    except api.CommandFailed:
+        print("Fail")
+
+def videos_viewed(rid):
+    import api
+    try:
+        if not write_chunks(api.Client().videos_viewed(rid, stream=True)):
+            print("Fail")
+            return False
+        return True
+    except api.CommandFailed:
+        print("Fail")
+        return False
 
+def videos_viewed_many_query(rids=None, rid_range=None):
+    if rid_range is not None:
+        rid_filter = "BETWEEN %s AND %s"
+        params = tuple(rid_range)
+    else:
+        rid_filter = "IN ({})".format(", ".join(["%s"] * len(rids)))
+        params = tuple(rids)
+    return VIDEOS_VIEWED_MANY_SQL.format(rid_filter=rid_filter), params + params
+
+def videos_viewed_many(rids=None, rid_range=None):
+    """
+    videosViewed for many releases with one grouped query: either a list of rids or an inclusive (low, high) range.
+    Rows come out ordered by rid, then ep_num, in the same format as videos_viewed.
+    """
+    import api
     try:
-        database_cursor.execute("""
-            SELECT viewer.uid, viewer.first_name, viewer.last_name
-            FROM viewers viewer
-            JOIN sessions session ON viewer.uid = session.uid
-            WHERE session.initiate_at BETWEEN %s AND %s
-            GROUP BY viewer.uid, viewer.first_name, viewer.last_name
-            HAVING COUNT(session.sid) >= %s
-            ORDER BY viewer.uid ASC
-        """, (start_date, end_date, minimum_sessions))
+        if not write_chunks(api.Client().videos_viewed_many(rids, rid_range, stream=True)):
+            print("Fail")
+            return False
+        return True
+    except api.CommandFailed:
+        print("Fail")
+        return False
+
+def parse_rids(args):
+    """
+    Reads videosViewed arguments: "low-high" is a range, anything else is rids separated by spaces or commas.
+    Returns (rids, rid_range) with one of the two set.
+    """
+    import re
+    if len(args) == 1:
+        matched = re.fullmatch(r"(\d+)-(\d+)", args[0])
+        if matched:
+            return None, (int(matched.group(1)), int(matched.group(2)))
+    return [int(rid) for arg in args for rid in arg.split(",") if rid], None
+
+
+def run_commands(lines):
+    """
+    Runs one command per line over pooled connections, printing the same output as separate CLI calls.
+    Blank lines and lines starting with # are skipped.
+    """
+    import shlex
+    use_statement_registry()
+    use_pool()
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            handle_command(shlex.split(line))
+        except (IndexError, ValueError):
+            print("Fail")
+        sys.stdout.flush()
+
+def repl(script_path=None):
+    if script_path is None:
+        run_commands(sys.stdin)
+    else:
+        with open(script_path, 'r') as script:
+            run_commands(script)
+
+DEFAULT_BATCH_COMMIT_EVERY = 1000
 
-        matching_viewers = database_cursor.fetchall()
+def viewer_statements(args):
+    uid, email, nickname, street, city, state, zip_code, genres, joined_date, first_name, last_name, subscription = args
+    statements = [(INSERT_USER_SQL, (int(uid), email, joined_date, nickname, street, city, state, zip_code, genres)),
+                  (INSERT_VIEWER_SQL, (int(uid), subscription, first_name, last_name))]
+    if normalized_genres:
+        statements.append((SYNC_ONE_USER_GENRES_SQL, (int(uid),)))
+    return statements
 
-        for viewer in matching_viewers:
-            formatted_viewer = ",".join(str(detail) if detail is not None else "NULL" for detail in viewer)
-            print(formatted_viewer)
+def movie_statements(args):
+    rid, website_url = args
+    return [(INSERT_MOVIE_SQL, (int(rid), website_url))]
 
+def session_statements(args):
+    sid, uid, rid, ep_num, initiate_at, leave_at, quality, device = args
+    return [(INSERT_SESSION_SQL, (int(sid), int(uid), int(rid), int(ep_num), initiate_at, leave_at, quality, device)),
+            (COUNT_DAILY_SESSION_SQL, (initiate_at, int(uid)))]
+
+# Write commands that batch mode groups into multi-row statements: command -> args to [(sql, params), ...]
+BATCH_STATEMENTS = {
+    "insertViewer": viewer_statements,
+    "insertMovie": movie_statements,
+    "insertSession": session_statements,
+}
+
+def execute_group(cursor, group, conn=None):
+    """
+    Runs a run of same-kind write commands as one executemany per statement.
+    If that fails, each command is retried under its own savepoint so only the bad ones are marked Fail.
+    group is a list of statement lists (None for commands that did not parse); returns one result per command.
+    """
+    statements = [command for command in group if command is not None]
+    cursor.execute("SAVEPOINT batch_group")
+    try:
+        for position in range(len(statements[0]) if statements else 0):
+            cursor.executemany(statements[0][position][0], [command[position][1] for command in statements])
+        cursor.execute("RELEASE SAVEPOINT batch_group")
+        return ["Fail" if command is None else "Success" for command in group]
     except mysql.connector.Error:
-        print("Fail")
-    finally:
-        database_cursor.close()
-        database_connection.close()
+        cursor.execute("ROLLBACK TO SAVEPOINT batch_group")
 
+    results = []
+    for command in group:
+        if command is None:
+            results.append("Fail")
+            continue
+        cursor.execute("SAVEPOINT batch_command")
+        try:
+            for sql, params in command:
+                execute_statement(conn, cursor, sql, params)
+            cursor.execute("RELEASE SAVEPOINT batch_command")
+            results.append("Success")
+        except mysql.connector.Error:
+            cursor.execute("ROLLBACK TO SAVEPOINT batch_command")
+            results.append("Fail")
+    return results
 
-def videos_viewed(rid):
+def run_batch(lines, commit_every=DEFAULT_BATCH_COMMIT_EVERY):
+    """
+    Runs a file of commands in the handle_command grammar on one connection.
+    Consecutive insertViewer/insertMovie/insertSession commands become multi-row inserts and are committed every
+    commit_every commands; any other command commits what is pending first and then runs as usual.
+    Results are printed in input order once the commands they belong to are committed.
+    """
+    import shlex
+    use_statement_registry()
+    use_pool()
     conn = connect_db()
     cursor = conn.cursor()
+    genre_table_enabled(cursor)
+    if ensure_rollups(cursor):
+        conn.commit()
+    pending_results = []
+    written_tables = set()
+    group_command = None
+    group = []
+
+    def flush_group():
+        nonlocal group_command, group
+        if group:
+            pending_results.extend(execute_group(cursor, group, conn))
+            written_tables.update(WRITE_TABLES[group_command])
+        group_command = None
+        group = []
+
+    def commit_pending():
+        flush_group()
+        try:
+            conn.commit()
+            results = pending_results
+        except mysql.connector.Error:
+            conn.rollback()
+            results = ["Fail"] * len(pending_results)
+        invalidate_cache(written_tables)
+        written_tables.clear()
+        for result in results:
+            print(result)
+        pending_results.clear()
+        sys.stdout.flush()
+
     try:
-        cursor.execute("""
-            SELECT COUNT(DISTINCT s.uid) 
-            FROM sessions s 
-            WHERE s.rid = %s
-        """, (rid,))
-        viewer_count = cursor.fetchone()[0]
-
-        cursor.execute("""
-            SELECT rid, ep_num, title, length
-            FROM videos
-            WHERE rid = %s
-            ORDER BY ep_num ASC
-        """, (rid,))
-        
-        results = cursor.fetchall()
-        
-        if results:
-            for row in results:
-                full_row = list(row) + [viewer_count]
-                print(",".join(str(item) if item is not None else "NULL" for item in full_row))
-        else:
-            print("Fail")
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                argv = shlex.split(line)
+                command, args = argv[0], argv[1:]
+            except (IndexError, ValueError):
+                # An unparseable line (say an unbalanced quote) fails on its own, in order, like a bad command.
+                if group:
+                    group.append(None)
+                else:
+                    pending_results.append("Fail")
+                continue
+            if command in BATCH_STATEMENTS:
+                if command != group_command:
+                    flush_group()
+                    group_command = command
+                try:
+                    group.append(BATCH_STATEMENTS[command](args))
+                except ValueError:
+                    group.append(None)
+                if len(pending_results) + len(group) >= commit_every:
+                    commit_pending()
+            else:
+                commit_pending()
+                try:
+                    handle_command(argv)
+                except (IndexError, ValueError):
+                    print("Fail")
+                sys.stdout.flush()
+        commit_pending()
     except mysql.connector.Error as err:
-        print("Fail")
+        conn.rollback()
+        for _ in range(len(pending_results) + len(group)):
+            print("Fail")
+        print("Fail", err)
     finally:
         cursor.close()
         conn.close()
 
+def batch(script_path, commit_every=DEFAULT_BATCH_COMMIT_EVERY):
+    with open(script_path, 'r') as script:
+        run_batch(script, commit_every)
+
+# Tables each cacheable query command reads, and tables each write command changes.
+CACHED_QUERY_TABLES = {
+    "listReleases": ("releases", "reviews"),
+    "popularRelease": ("releases", "release_stats"),
+    "releaseTitle": ("sessions", "releases", "videos"),
+    "videosViewed": ("sessions", "videos"),
+}
+ALL_TABLES = tuple(TABLE_DEFINITIONS) + tuple(ROLLUP_TABLES) + ("user_genres",)
+WRITE_TABLES = {
+    "import": ALL_TABLES,
+    "insertViewer": ("users", "viewers", "user_genres"),
+    "addGenre": ("users", "user_genres"),
+    "migrateGenres": ("user_genres",),
+    "deleteViewer": ("users", "viewers", "user_genres", "reviews", "sessions", "release_stats", "viewer_daily_sessions"),
+    "deleteViewers": ("users", "viewers", "user_genres", "reviews", "sessions", "release_stats", "viewer_daily_sessions"),
+    "insertMovie": ("movies",),
+    "insertSession": ("sessions", "viewer_daily_sessions"),
+    "updateRelease": ("releases",),
+    "rebuildRollups": tuple(ROLLUP_TABLES),
+    "maintainPartitions": ("sessions", "viewer_daily_sessions"),
+}
+
+query_cache = None
 
-def handle_command():
-    if len(sys.argv) < 2:
+def get_result_cache():
+    """
+    Opens the result cache named by CS122A_CACHE ("memory" or an SQLite file path) on first use.
+    CS122A_CACHE_TTL (seconds) and CS122A_CACHE_SIZE (entries) bound it. Returns None when caching is off.
+    """
+    global query_cache
+    if query_cache is None and os.environ.get("CS122A_CACHE"):
+        import result_cache as cache_backends
+        query_cache = cache_backends.open_cache(
+            os.environ["CS122A_CACHE"],
+            int(os.environ.get("CS122A_CACHE_SIZE", cache_backends.DEFAULT_MAX_ENTRIES)),
+            float(os.environ.get("CS122A_CACHE_TTL", cache_backends.DEFAULT_TTL)))
+    return query_cache
+
+def get_tracer():
+    """
+    Turns on per-command tracing when CS122A_TRACE or CS122A_SLOW_MS is set (see tracing.tracer_from_env);
+    "python project.py --trace <file> <command> ..." sets CS122A_TRACE for one call.
+    """
+    global tracer
+    if tracer is None and (os.environ.get("CS122A_TRACE") or os.environ.get("CS122A_SLOW_MS")):
+        import tracing
+        tracer = tracing.tracer_from_env()
+    return tracer
+
+def invalidate_cache(tables):
+    cache = get_result_cache()
+    if cache is not None and tables:
+        cache.invalidate(tables)
+
+def run_cached(cache, command, args):
+    """
+    Serves a query command from the cache, or runs it while copying its output into the cache.
+    Table versions are read before the query runs, so a write that lands meanwhile makes the new entry stale.
+    Output is only stored when the command returns True; a command that fails or raises stores nothing.
+    """
+    from result_cache import TeeWriter
+    tables = CACHED_QUERY_TABLES[command]
+    key = "\x1f".join([command] + args)
+    output = cache.get(key, tables)
+    if output is not None:
+        sys.stdout.write(output)
+        return
+    versions = cache.snapshot(tables)
+    stdout = sys.stdout
+    sys.stdout = tee = TeeWriter(stdout)
+    try:
+        succeeded = dispatch_command(command, args)
+    finally:
+        sys.stdout = stdout
+    output = tee.getvalue()
+    if succeeded is True and output is not None:
+        cache.put(key, output, versions)
+
+def handle_command(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if len(argv) < 1:
         print("Invalid command.")
         return
-    command = sys.argv[1]
-    args = sys.argv[2:]
-    
-    if command == "import":
-        import_data(args[0])
-    elif command == "insertViewer":
-        insert_viewer(int(args[0]), args[1], args[2], args[3], args[4], args[5],
-                      args[6], args[7], args[8], args[9], args[10], args[11])
-    elif command == "addGenre":
-        add_genre(int(args[0]), args[1])
-    elif command == "deleteViewer":
-        delete_viewer(int(args[0]))
-    elif command == "insertMovie":
-        insert_movie(int(args[0]), args[1])
-    elif command == "insertSession":
-        insert_session(int(args[0]), int(args[1]), int(args[2]), int(args[3]),
-                       args[4], args[5], args[6], args[7])
-    elif command == "updateRelease":
-        update_release(int(args[0]), args[1])
-    elif command == "listReleases":
-        list_releases(int(args[0]))
-    elif command == "popularRelease":
-        popular_release(int(args[0]))
-    elif command == "releaseTitle":
-        release_title(int(args[0]))
-    elif command == "activeViewer":
-        active_viewer(int(args[0]), args[1], args[2])
-    elif command == "videosViewed":
-        videos_viewed(int(args[0]))
-    else:
+    if argv[0] == "--trace" and len(argv) > 2:
+        os.environ["CS122A_TRACE"] = argv[1]
+        argv = argv[2:]
+    command = argv[0]
+    args = argv[1:]
+
+    active_tracer = get_tracer()
+    trace = active_tracer.start(command, args) if active_tracer is not None else None
+    cache = get_result_cache()
+    try:
+        if cache is not None and command in CACHED_QUERY_TABLES:
+            run_cached(cache, command, args)
+            return
+        try:
+            dispatch_command(command, args)
+        finally:
+            if cache is not None and command in WRITE_TABLES:
+                cache.invalidate(WRITE_TABLES[command])
+    finally:
+        if trace is not None:
+            active_tracer.finish(trace)
+
+def import_command(args):
+    folder_name, options = parse_import_args(args)
+    import_data(folder_name, **options)
+
+def videos_viewed_command(args):
+    rids, rid_range = parse_rids(args)
+    if rids is not None and len(rids) == 1:
+        return videos_viewed(rids[0])
+    return videos_viewed_many(rids, rid_range)
+
+# Command name -> handler taking the raw argument strings.
+COMMANDS = {
+    "repl": lambda args: repl(*args[:1]),
+    "batch": lambda args: batch(args[0], *(int(arg) for arg in args[1:2])),
+    "import": lambda args: import_command(args),
+    "insertViewer": lambda args: insert_viewer(int(args[0]), args[1], args[2], args[3], args[4], args[5],
+                                               args[6], args[7], args[8], args[9], args[10], args[11]),
+    "migrateGenres": lambda args: migrate_genres(),
+    "addGenre": lambda args: add_genre(int(args[0]), args[1]),
+    "deleteViewer": lambda args: delete_viewer(int(args[0])),
+    "deleteViewers": delete_viewers_command,
+    "insertMovie": lambda args: insert_movie(int(args[0]), args[1]),
+    "insertSession": lambda args: insert_session(int(args[0]), int(args[1]), int(args[2]), int(args[3]),
+                                                 args[4], args[5], args[6], args[7]),
+    "updateRelease": lambda args: update_release(int(args[0]), args[1]),
+    "rebuildRollups": lambda args: rebuild_rollups(),
+    "ensureIndexes": lambda args: ensure_indexes(),
+    "maintainPartitions": maintain_partitions_command,
+    "statementStats": lambda args: statement_stats(),
+    "listReleases": lambda args: list_releases(int(args[0])),
+    "popularRelease": lambda args: popular_release(int(args[0])),
+    "releaseTitle": lambda args: release_title(int(args[0])),
+    "activeViewer": lambda args: active_viewer(int(args[0]), args[1], args[2]),
+    "videosViewed": videos_viewed_command,
+}
+
+def dispatch_command(command, args):
+    handler = COMMANDS.get(command)
+    if handler is None:
         print(f"Unknown command: {command}")
+        return False
+    return handler(args)
 
 if __name__ == "__main__":
-    handle_command()
\ No newline at end of file
+    # api.py and the other helper modules import "project"; point that name at this running script
+    # so they share its pool, cache and tracer instead of loading a second copy.
+    sys.modules.setdefault("project", sys.modules[__name__])
+    handle_command()
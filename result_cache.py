@@ -0,0 +1,142 @@
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 1000
+MAX_CACHED_OUTPUT = 1024 * 1024
+
+class MemoryCache:
+    """
+    In-process LRU of command output for repl mode.
+    Only sees invalidations made by this process, so use it when the repl is the only writer.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.versions = {}
+
+    def snapshot(self, tables):
+        return {table: self.versions.get(table, 0) for table in tables}
+
+    def get(self, key, tables):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        output, created, versions = entry
+        if time.time() - created > self.ttl or versions != self.snapshot(tables):
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return output
+
+    def put(self, key, output, versions):
+        self.entries[key] = (output, time.time(), versions)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, tables):
+        for table in tables:
+            self.versions[table] = self.versions.get(table, 0) + 1
+
+class SQLiteCache:
+    """
+    On-disk cache shared by separate CLI processes.
+    Table versions live next to the entries, so a write in one process invalidates entries read by another.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db = sqlite3.connect(path, timeout=10, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                output TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL,
+                versions TEXT NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed)")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS table_versions (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            )
+        """)
+
+    def snapshot(self, tables):
+        placeholders = ", ".join("?" * len(tables))
+        rows = self.db.execute(f"SELECT name, version FROM table_versions WHERE name IN ({placeholders})",
+                               list(tables)).fetchall()
+        versions = {table: 0 for table in tables}
+        versions.update(rows)
+        return versions
+
+    def get(self, key, tables):
+        row = self.db.execute("SELECT output, created, versions FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        output, created, versions = row
+        if time.time() - created > self.ttl or json.loads(versions) != self.snapshot(tables):
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return None
+        self.db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        return output
+
+    def put(self, key, output, versions):
+        now = time.time()
+        self.db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                        (key, output, now, now, json.dumps(versions, sort_keys=True)))
+        self.db.execute("""
+            DELETE FROM entries WHERE key NOT IN (
+                SELECT key FROM entries ORDER BY accessed DESC LIMIT ?
+            )
+        """, (self.max_entries,))
+
+    def invalidate(self, tables):
+        self.db.executemany("""
+            INSERT INTO table_versions (name, version) VALUES (?, 1)
+            ON CONFLICT (name) DO UPDATE SET version = version + 1
+        """, [(table,) for table in tables])
+
+class TeeWriter:
+    """
+    Passes writes through to stream and keeps a copy of them until the copy grows past limit.
+    """
+
+    def __init__(self, stream, limit=MAX_CACHED_OUTPUT):
+        self.stream = stream
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+
+    def write(self, text):
+        if self.parts is not None:
+            self.size += len(text)
+            if self.size > self.limit:
+                self.parts = None
+            else:
+                self.parts.append(text)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def getvalue(self):
+        return None if self.parts is None else "".join(self.parts)
+
+def open_cache(spec, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+    """
+    spec is "memory" for the in-process LRU, otherwise the path of an SQLite cache file.
+    """
+    if spec == "memory":
+        return MemoryCache(max_entries, ttl)
+    return SQLiteCache(os.path.expanduser(spec), max_entries, ttl)
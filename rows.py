@@ -0,0 +1,8 @@
+from collections import namedtuple
+
+# Typed result rows for the query commands, in the same column order as the CLI output.
+ReleaseRow = namedtuple("ReleaseRow", ["rid", "genre", "title"])
+PopularReleaseRow = namedtuple("PopularReleaseRow", ["rid", "title", "review_count"])
+ReleaseTitleRow = namedtuple("ReleaseTitleRow", ["rid", "release_title", "genre", "video_title", "ep_num", "length"])
+ActiveViewerRow = namedtuple("ActiveViewerRow", ["uid", "first_name", "last_name"])
+VideoViewRow = namedtuple("VideoViewRow", ["rid", "ep_num", "title", "length", "viewer_count"])
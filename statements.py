@@ -0,0 +1,61 @@
+"""
+Server-side prepared statements for the hot write and lookup paths, kept for the life of a connection.
+
+repl and batch mode turn the registry on (project.use_statement_registry); single CLI calls run each statement
+once, where preparing would only add a round trip. Each SQL string gets its own prepared cursor per connection,
+because a mysql.connector prepared cursor only keeps the statement it ran last.
+"""
+import weakref
+
+ER_UNKNOWN_STMT_HANDLER = 1243
+
+def raw_connection(conn):
+    """
+    The driver connection under a tracing wrapper and/or a pool handle, which is what owns the statements.
+    """
+    conn = getattr(conn, "conn", conn)
+    return getattr(conn, "_cnx", conn)
+
+class StatementRegistry:
+    def __init__(self):
+        self.connections = weakref.WeakKeyDictionary()
+        self.counts = {}
+
+    def cursor(self, conn, sql):
+        statements = self.connections.setdefault(raw_connection(conn), {})
+        counts = self.counts.setdefault(sql, [0, 0])
+        cursor = statements.get(sql)
+        if cursor is None:
+            cursor = statements[sql] = raw_connection(conn).cursor(prepared=True)
+            counts[0] += 1
+        else:
+            counts[1] += 1
+        trace = getattr(conn, "trace", None)
+        if trace is not None:
+            import tracing
+            return tracing.TracedCursor(cursor, trace)
+        return cursor
+
+    def execute(self, conn, sql, params):
+        """
+        Runs sql as a prepared statement on conn and returns the cursor holding its result.
+        A statement the server no longer knows (the connection reconnected) is prepared again once.
+        """
+        cursor = self.cursor(conn, sql)
+        try:
+            cursor.execute(sql, params)
+        except Exception as err:
+            if getattr(err, "errno", None) != ER_UNKNOWN_STMT_HANDLER:
+                raise
+            self.connections[raw_connection(conn)].pop(sql, None)
+            cursor = self.cursor(conn, sql)
+            cursor.execute(sql, params)
+        return cursor
+
+    def stats(self):
+        """
+        (prepared, reused, [(sql, prepared, reused), ...] busiest first)
+        """
+        per_statement = sorted(((sql, prepared, reused) for sql, (prepared, reused) in self.counts.items()),
+                               key=lambda entry: entry[1] + entry[2], reverse=True)
+        return (sum(entry[1] for entry in per_statement), sum(entry[2] for entry in per_statement), per_statement)
@@ -0,0 +1,125 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project
+
+
+@pytest.fixture
+def mysql_conn():
+    """
+    A connection to the project database (project.DB_CONFIG) that allows LOCAL INFILE; skips without a server.
+    """
+    pytest.importorskip("mysql.connector")
+    project.load_driver()
+    try:
+        conn = project.mysql.connector.connect(**project.DB_CONFIG, allow_local_infile=True)
+    except project.mysql.connector.Error as err:
+        pytest.skip(f"no MySQL server: {err}")
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+class RecordingCursor:
+    """
+    Stands in for a mysql.connector cursor and records every statement in executed as (sql, params);
+    executemany records the list of parameter rows. Each keyword maps a SQL fragment to what a statement
+    containing it does (the first matching fragment wins):
+    results   rows it returns, or a function of its params that returns them
+    rowcounts successive rowcount values (otherwise the number of rows returned or parameter rows given)
+    fail_on   the exception it raises, before anything is recorded
+    """
+
+    def __init__(self, results=None, rowcounts=None, fail_on=None):
+        self.results = results or {}
+        self.rowcounts = {fragment: iter(counts) for fragment, counts in (rowcounts or {}).items()}
+        self.fail_on = fail_on or {}
+        self.executed = []
+        self.rows = []
+        self.rowcount = -1
+        self.closed = False
+
+    @property
+    def statements(self):
+        return [sql for sql, _ in self.executed]
+
+    def matching(self, mapping, sql):
+        return next((value for fragment, value in mapping.items() if fragment in sql), None)
+
+    def run(self, sql, params, rows_given):
+        error = self.matching(self.fail_on, sql)
+        if error is not None:
+            raise error
+        self.executed.append((sql, params))
+        rows = self.matching(self.results, sql) or []
+        self.rows = list(rows(params) if callable(rows) else rows)
+        counts = self.matching(self.rowcounts, sql)
+        self.rowcount = next(counts) if counts is not None else rows_given if rows_given is not None else len(self.rows)
+
+    def execute(self, sql, params=None):
+        self.run(sql, params, None)
+
+    def executemany(self, sql, seq_params):
+        seq_params = list(seq_params)
+        self.run(sql, seq_params, len(seq_params))
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchmany(self, size=1):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        self.closed = True
+
+
+class RecordingConnection:
+    """
+    Hands out one RecordingCursor and counts commits and rollbacks.
+    """
+
+    def __init__(self, cursor=None):
+        self.recording_cursor = cursor or RecordingCursor()
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, **options):
+        return self.recording_cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def recording_cursor(monkeypatch):
+    """
+    The RecordingCursor class; the driver is loaded so that fail_on can use project.mysql.connector errors, and
+    the rollup tables count as present unless a test resets project.rollups_ready.
+    """
+    project.load_driver()
+    monkeypatch.setattr(project, "rollups_ready", True)
+    return RecordingCursor
+
+
+@pytest.fixture
+def recording_connection(monkeypatch):
+    project.load_driver()
+    monkeypatch.setattr(project, "rollups_ready", True)
+    return RecordingConnection
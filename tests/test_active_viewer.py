@@ -0,0 +1,79 @@
+import sqlite3
+from datetime import date, datetime
+
+import pytest
+
+import project
+
+# Sessions on the edges the rollup query splits on: midnight, a second either side of it, and midday.
+SESSION_TIMES = ["00:00:00", "00:00:01", "06:00:00", "12:00:00", "12:00:01", "23:59:58", "23:59:59"]
+WINDOWS = {
+    "aligned dates": ("2024-01-02", "2024-01-04"),
+    "aligned days through 23:59:59": ("2024-01-02 00:00:00", "2024-01-04 23:59:59"),
+    "mid-day start": ("2024-01-01 12:00:00", "2024-01-04 23:59:59"),
+    "mid-day end": ("2024-01-02 00:00:00", "2024-01-04 12:00:00"),
+    "mid-day start and end": ("2024-01-01 12:00:01", "2024-01-05 06:00:00"),
+    "inside one day": ("2024-01-03 06:00:00", "2024-01-03 18:00:00"),
+    "one whole day ending 23:59:59": ("2024-01-03 00:00:00", "2024-01-03 23:59:59"),
+    "ending a second before midnight": ("2024-01-02 00:00:01", "2024-01-03 23:59:58"),
+    "starting and ending on a session": ("2024-01-03 12:00:01", "2024-01-04 12:00:00"),
+    "start after end": ("2024-01-05 00:00:00", "2024-01-01 00:00:00"),
+}
+
+
+def sqlite_param(value):
+    """
+    sqlite compares the stored text, so values are spelled the way MySQL reads them against a DATETIME
+    ('2024-01-04' is midnight) or a DATE column.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.isoformat(" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+@pytest.fixture(scope="module")
+def db():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE viewers (uid INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT)")
+    conn.execute("CREATE TABLE sessions (sid INTEGER PRIMARY KEY, uid INTEGER, initiate_at TEXT)")
+    conn.execute("CREATE TABLE viewer_daily_sessions (day TEXT, uid INTEGER, session_count INTEGER)")
+    conn.executemany("INSERT INTO viewers VALUES (?, ?, ?)", [(uid, f"First{uid}", f"Last{uid}") for uid in range(1, 6)])
+    sessions = []
+    for day in range(1, 6):
+        for position, time in enumerate(SESSION_TIMES):
+            uid = (day + position) % 5 + 1
+            sessions.append((len(sessions) + 1, uid, f"2024-01-{day:02d} {time}"))
+    conn.executemany("INSERT INTO sessions VALUES (?, ?, ?)", sessions)
+    conn.execute(project.BUILD_VIEWER_DAILY_SESSIONS_SQL)
+    yield conn
+    conn.close()
+
+
+def run(db, sql, params):
+    return db.execute(sql.replace("%s", "?"), tuple(sqlite_param(value) for value in params)).fetchall()
+
+
+@pytest.mark.parametrize("window", list(WINDOWS), ids=list(WINDOWS))
+@pytest.mark.parametrize("minimum_sessions", range(1, 9))
+def test_rollup_query_matches_the_session_query(db, window, minimum_sessions):
+    start_date, end_date = WINDOWS[window]
+    expected = run(db, project.ACTIVE_VIEWER_SQL, (start_date, end_date, minimum_sessions))
+    sql, params = project.active_viewer_query(minimum_sessions, start_date, end_date)
+    assert run(db, sql, params) == expected
+
+
+@pytest.mark.parametrize("window, uses_rollup", [
+    ("aligned dates", True),
+    ("mid-day start and end", True),
+    ("one whole day ending 23:59:59", True),
+    ("inside one day", False),
+    ("ending a second before midnight", False),
+    ("start after end", False),
+])
+def test_rollup_is_only_used_for_windows_with_a_whole_day(window, uses_rollup):
+    sql, _ = project.active_viewer_query(1, *WINDOWS[window])
+    assert (sql is project.ACTIVE_VIEWER_ROLLUP_SQL) == uses_rollup
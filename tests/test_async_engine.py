@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+import async_engine
+from rows import ReleaseTitleRow
+
+TITLE_ROW = (7, "Release", "Drama", "Pilot", 1, 42)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def execute(self, sql, params):
+        self.conn.server.running += 1
+        self.conn.server.most_running = max(self.conn.server.most_running, self.conn.server.running)
+        await asyncio.sleep(0.01)
+        self.conn.server.running -= 1
+        if params == ("boom",):
+            raise RuntimeError("query failed")
+
+    async def fetchall(self):
+        return [TITLE_ROW]
+
+    async def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, server):
+        self.server = server
+        self.closed = False
+
+    async def cursor(self):
+        return FakeCursor(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeServer:
+    def __init__(self):
+        self.connections = []
+        self.running = 0
+        self.most_running = 0
+
+    async def connect(self):
+        conn = FakeConnection(self)
+        self.connections.append(conn)
+        return conn
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, timeout=5))
+
+
+def test_concurrent_lookups_share_at_most_size_connections():
+    server = FakeServer()
+
+    async def lookups():
+        pool = await async_engine.create_pool(size=3, connect=server.connect)
+        results = await asyncio.gather(*(async_engine.release_title(pool, sid) for sid in range(20)))
+        await pool.close()
+        return results
+
+    results = run(lookups())
+    assert results == [[ReleaseTitleRow(*TITLE_ROW)]] * 20
+    assert len(server.connections) == 3
+    assert server.most_running == 3
+    assert all(conn.closed for conn in server.connections)
+
+
+def test_failed_query_discards_its_connection_and_wakes_a_waiter():
+    server = FakeServer()
+
+    async def lookups():
+        pool = await async_engine.create_pool(size=1, connect=server.connect)
+        failing = asyncio.ensure_future(async_engine.release_title(pool, "boom"))
+        waiting = asyncio.ensure_future(async_engine.release_title(pool, 1))
+        with pytest.raises(RuntimeError):
+            await failing
+        rows = await waiting
+        await pool.close()
+        return rows
+
+    assert run(lookups()) == [ReleaseTitleRow(*TITLE_ROW)]
+    assert len(server.connections) == 2
+    assert server.connections[0].closed
+
+
+def test_failed_connect_frees_its_slot():
+    server = FakeServer()
+    attempts = []
+
+    async def flaky_connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("refused")
+        return await server.connect()
+
+    async def lookups():
+        pool = await async_engine.create_pool(size=1, connect=flaky_connect)
+        with pytest.raises(ConnectionError):
+            await async_engine.release_title(pool, 1)
+        return await async_engine.release_title(pool, 1)
+
+    assert run(lookups()) == [ReleaseTitleRow(*TITLE_ROW)]
+
+
+def test_close_closes_idle_connections_and_ones_returned_later():
+    server = FakeServer()
+
+    async def lookups():
+        pool = await async_engine.create_pool(size=2, connect=server.connect)
+        await async_engine.release_title(pool, 1)
+        async with pool.connection() as busy:
+            await async_engine.release_title(pool, 2)
+            await pool.close()
+            assert not busy.closed
+        return busy
+
+    busy = run(lookups())
+    assert busy.closed
+    assert all(conn.closed for conn in server.connections)
@@ -0,0 +1,18 @@
+import project
+
+
+def test_unparseable_line_fails_in_place(monkeypatch, capsys, recording_connection):
+    conn = recording_connection()
+    monkeypatch.setattr(project, "use_statement_registry", lambda: None)
+    monkeypatch.setattr(project, "use_pool", lambda: None)
+    monkeypatch.setattr(project, "connect_db", lambda **options: conn)
+    monkeypatch.setattr(project, "normalized_genres", False)
+    monkeypatch.delenv("CS122A_CACHE", raising=False)
+    project.run_batch([
+        "insertMovie 1 https://a.example",
+        "insertMovie 2 'https://b.example",
+        "insertMovie 3 https://c.example",
+        "\"unbalanced",
+    ])
+    assert capsys.readouterr().out.split() == ["Success", "Fail", "Success", "Fail"]
+    assert conn.commits == 1
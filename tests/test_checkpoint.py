@@ -0,0 +1,101 @@
+import json
+
+import import_checkpoint
+import project
+
+USERS_CSV = ("uid,email,joined_date,nickname,street,city,state,zip,genres\n"
+             "1,a@example.com,2024-01-01,,,,,,\n"
+             "2,b@example.com,2024-01-02,,,,,,\n"
+             "3,c@example.com,2024-01-03,,,,,,\n"
+             "4,d@example.com,2024-01-04,,,,,,\n")
+
+
+def started_checkpoint(path, tables=None, checksums=None):
+    checkpoint = import_checkpoint.Checkpoint(str(path))
+    checkpoint.start(checksums or {"users.csv": "abc"}, {"fast": False})
+    for table, (line, rows, done) in (tables or {}).items():
+        checkpoint.advance(table, line, rows, done)
+    return checkpoint
+
+
+def test_load_rows_skips_the_lines_already_committed(tmp_path, recording_cursor):
+    csv_path = tmp_path / "users.csv"
+    csv_path.write_text(USERS_CSV)
+    checkpoint = started_checkpoint(tmp_path / "import.checkpoint", {"users": (3, 2, False)})
+    cursor = recording_cursor()
+    options = dict(project.DEFAULT_IMPORT_OPTIONS, checkpoint=checkpoint, chunk_size=1)
+    assert project.load_rows(cursor, "users", str(csv_path), options) == 4
+    inserted = [params for sql, params in cursor.executed if sql.startswith("INSERT")]
+    assert [rows[0][0] for rows in inserted] == ["3", "4"]
+    assert cursor.statements.count("COMMIT") == 2
+    assert checkpoint.table("users") == {"line": 5, "rows": 4, "done": False}
+
+
+def test_resume_empties_a_table_whose_count_disagrees(tmp_path, recording_cursor):
+    checkpoint = started_checkpoint(tmp_path / "import.checkpoint", {
+        "users": (5, 4, True), "viewers": (11, 10, False), "producers": (3, 2, False)})
+    counts = {"viewers": 12, "producers": 2}
+    cursor = recording_cursor(results={f"SELECT COUNT(*) FROM {table}": [(counts.get(table, 0),)]
+                                       for table in project.TABLE_DEFINITIONS})
+
+    tables = project.resume_checkpoint(cursor, checkpoint)
+
+    assert tables == [table for table in project.TABLE_DEFINITIONS if table != "users"]
+    assert "SELECT COUNT(*) FROM users" not in cursor.statements
+    assert [sql for sql in cursor.statements if sql.startswith("TRUNCATE")] == ["TRUNCATE TABLE viewers;"]
+    assert checkpoint.table("viewers") == {"line": 1, "rows": 0, "done": False}
+    assert checkpoint.table("producers") == {"line": 3, "rows": 2, "done": False}
+    with open(checkpoint.path) as checkpoint_file:
+        assert "viewers" not in json.load(checkpoint_file)["tables"]
+
+
+def test_checkpoint_resumes_only_for_the_same_checksums(tmp_path):
+    path = tmp_path / "import.checkpoint"
+    started_checkpoint(path, {"users": (3, 2, False)})
+
+    same = import_checkpoint.Checkpoint(str(path))
+    assert same.start({"users.csv": "abc"}, {"fast": True}) == {"fast": False}
+    assert same.resumed
+    assert same.table("users")["line"] == 3
+
+    changed = import_checkpoint.Checkpoint(str(path))
+    assert changed.start({"users.csv": "def"}, {"fast": True}) == {"fast": True}
+    assert not changed.resumed
+    assert changed.table("users") == {"line": 1, "rows": 0, "done": False}
+    with open(path) as checkpoint_file:
+        assert json.load(checkpoint_file) == {"checksums": {"users.csv": "def"}, "settings": {"fast": True},
+                                              "tables": {}}
+
+
+def run_stopped_import(monkeypatch, folder, checkpoint_path, recording_cursor, recording_connection):
+    """
+    Runs a checkpointed import whose loading fails, returning the statements issued before loading started.
+    """
+    cursor = recording_cursor(results={"SELECT COUNT(*) FROM": [(0,)], "@@GLOBAL.local_infile": [(0,)]})
+    monkeypatch.setattr(project, "connect_db", lambda: recording_connection(cursor))
+    monkeypatch.setattr(project, "normalized_genres", False)
+    monkeypatch.setattr(project, "schedule_import", lambda *args: ({}, {"users": "stopped"}, []))
+    project.import_data(str(folder), checkpoint_path=str(checkpoint_path))
+    return cursor.statements
+
+
+def test_import_starts_over_when_the_files_change(monkeypatch, tmp_path, capsys, recording_cursor,
+                                                   recording_connection):
+    (tmp_path / "users.csv").write_text(USERS_CSV)
+    checkpoint_path = tmp_path / "import.checkpoint"
+    run_stopped_import(monkeypatch, tmp_path, checkpoint_path, recording_cursor, recording_connection)
+    checkpoint = import_checkpoint.Checkpoint(str(checkpoint_path))
+    checkpoint.start(project.import_checksums(str(tmp_path)), {})
+    checkpoint.advance("users", 3, 2)
+
+    resumed = run_stopped_import(monkeypatch, tmp_path, checkpoint_path, recording_cursor, recording_connection)
+    assert not [sql for sql in resumed if sql.startswith("DROP TABLE")]
+    assert "SELECT COUNT(*) FROM users" in resumed
+
+    (tmp_path / "users.csv").write_text(USERS_CSV + "5,e@example.com,2024-01-05,,,,,,\n")
+    restarted = run_stopped_import(monkeypatch, tmp_path, checkpoint_path, recording_cursor, recording_connection)
+    assert "DROP TABLE IF EXISTS users;" in restarted
+    assert "SELECT COUNT(*) FROM users" not in restarted
+    with open(checkpoint_path) as checkpoint_file:
+        assert json.load(checkpoint_file)["tables"] == {}
+    assert capsys.readouterr().out.split() == ["Fail"] * 3
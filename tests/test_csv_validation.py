@@ -0,0 +1,106 @@
+import csv
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+import csv_validation
+import project
+
+REVIEW = ["1", "2", "3", "4.5", "fine", "2024-01-02 03:04:05"]
+
+
+@pytest.fixture
+def validate_review():
+    return csv_validation.make_validator(project.TABLE_DEFINITIONS["reviews"])
+
+
+def review_with(**fields):
+    names = ["rvid", "uid", "rid", "rating", "comment", "posted_at"]
+    return [fields.get(name, value) for name, value in zip(names, REVIEW)]
+
+
+def test_a_good_row_comes_back_converted(validate_review):
+    assert validate_review(REVIEW) == [1, 2, 3, Decimal("4.5"), "fine", datetime(2024, 1, 2, 3, 4, 5)]
+
+
+@pytest.mark.parametrize("row", [REVIEW[:-1], REVIEW + ["extra"]])
+def test_wrong_column_count_is_rejected(validate_review, row):
+    with pytest.raises(ValueError, match="expected 6 columns"):
+        validate_review(row)
+
+
+@pytest.mark.parametrize("rvid, ok", [("2147483647", True), ("-2147483648", True),
+                                      ("2147483648", False), ("-2147483649", False), ("1.5", False)])
+def test_int_range(validate_review, rvid, ok):
+    if ok:
+        assert validate_review(review_with(rvid=rvid))[0] == int(rvid)
+    else:
+        with pytest.raises(ValueError):
+            validate_review(review_with(rvid=rvid))
+
+
+@pytest.mark.parametrize("rating, stored", [("4.45", "4.5"), ("-4.45", "-4.5"), ("4.44", "4.4"), ("0.05", "0.1"),
+                                            ("99.94", "99.9"), ("1e1", "10.0"), ("1e-30", "0.0"), ("0E+100", "0.0")])
+def test_decimal_rounds_half_up_like_mysql(validate_review, rating, stored):
+    assert validate_review(review_with(rating=rating))[3] == Decimal(stored)
+
+
+@pytest.mark.parametrize("rating", ["100", "99.95", "-99.95", "1e30", "-1e30", "1e999999", "NaN", "Infinity", "4,5"])
+def test_decimal_overflow_and_garbage_are_value_errors(validate_review, rating):
+    with pytest.raises(ValueError):
+        validate_review(review_with(rating=rating))
+
+
+def test_bare_decimal_is_ten_digits():
+    assert csv_validation.parse_decimal("9999999999", None, 0) == Decimal("9999999999")
+    with pytest.raises(ValueError):
+        csv_validation.parse_decimal("10000000000", None, 0)
+
+
+def test_dates_and_datetimes():
+    validate_user = csv_validation.make_validator(project.TABLE_DEFINITIONS["users"])
+    user = ["1", "a@example.com", "2024-02-29", "", "", "", "", "", ""]
+    assert validate_user(user)[2] == date(2024, 2, 29)
+    with pytest.raises(ValueError, match="joined_date"):
+        validate_user(user[:2] + ["2023-02-29"] + user[3:])
+    with pytest.raises(ValueError, match="posted_at"):
+        csv_validation.make_validator(project.TABLE_DEFINITIONS["reviews"])(review_with(posted_at="yesterday"))
+
+
+def test_empty_fields_are_null_unless_not_null():
+    validate_user = csv_validation.make_validator(project.TABLE_DEFINITIONS["users"])
+    assert validate_user(["1", "a@example.com"] + [""] * 7)[2:] == [None] * 7
+    with pytest.raises(ValueError, match="email is empty but NOT NULL"):
+        validate_user(["1", ""] + [""] * 7)
+    with pytest.raises(ValueError, match="uid is empty but NOT NULL"):
+        validate_user(["", "a@example.com"] + [""] * 7)
+
+
+def test_rejected_rows_keep_their_csv_line_numbers(tmp_path, validate_review):
+    csv_path = tmp_path / "reviews.csv"
+    csv_path.write_text("rvid,uid,rid,rating,comment,posted_at\n"
+                        "1,2,3,4.5,fine,2024-01-02 03:04:05\n"
+                        "2,2,3,1e30,\"two\nlines\",2024-01-02 03:04:05\n"
+                        "3,2,3,4.45,ok,2024-01-02 03:04:05\n"
+                        "x,2,3,4.5,bad id,2024-01-02 03:04:05\n")
+    rejects = csv_validation.RejectWriter(str(tmp_path / "rejects"), "reviews")
+    with open(csv_path, newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader)
+        chunks = list(project.read_chunks(reader, 10, validate_review, rejects))
+    rejects.close()
+    (line_numbers, rows), = chunks
+    assert line_numbers == [2, 5]
+    assert [row[3] for row in rows] == [Decimal("4.5"), Decimal("4.5")]
+    with open(rejects.path, newline='') as reject_file:
+        rejected = list(csv.reader(reject_file))
+    assert rejected[0] == ["line", "reason", "fields"]
+    assert [(line, fields[0]) for line, _, *fields in rejected[1:]] == [("4", "2"), ("6", "x")]
+    assert rejects.count == 2
+
+
+def test_reject_file_is_only_created_for_a_rejected_row(tmp_path):
+    rejects = csv_validation.RejectWriter(str(tmp_path / "rejects"), "reviews")
+    rejects.close()
+    assert not (tmp_path / "rejects").exists()
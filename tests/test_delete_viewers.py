@@ -0,0 +1,36 @@
+import api
+import project
+
+
+def test_batches_run_until_one_comes_back_short(monkeypatch, recording_cursor, recording_connection):
+    monkeypatch.setattr(project, "PURGE_UID_GROUP", 2)
+    review_batches = iter([[(10, 1), (11, 1)], [(12, 2), (13, None)], [], []])
+    cursor = recording_cursor(
+        results={"FROM reviews WHERE uid IN": lambda params: next(review_batches)},
+        rowcounts={"FROM sessions WHERE uid IN (%s, %s) LIMIT": [2, 2, 1],
+                   "FROM viewer_daily_sessions WHERE uid IN (%s, %s) LIMIT": [2, 0],
+                   "FROM viewer_daily_sessions WHERE uid IN (%s) LIMIT": [1],
+                   "DELETE FROM viewers": [2, 1]})
+    conn = recording_connection(cursor)
+    progress = []
+    deleted = api.Client(conn=conn).delete_viewers(
+        [1, 2, 3], batch_size=2, progress=lambda done, counts: progress.append((done, dict(counts))))
+
+    assert deleted == {"sessions": 5, "viewer_daily_sessions": 3, "reviews": 4, "viewers": 3}
+    assert [done for done, _ in progress] == [2, 3]
+    # Group [1, 2]: 3 session, 2 daily count, 3 review and 1 final transactions; group [3]: 1 + 1 + 1 + 1.
+    assert conn.commits == 13
+    assert conn.rollbacks == 0
+    stats_updates = [params for sql, params in cursor.executed if sql.startswith("UPDATE release_stats")]
+    assert stats_updates == [[(2, 1)], [(1, 2)]]
+    limits = [params[-1] for sql, params in cursor.executed if "LIMIT" in sql]
+    assert set(limits) == {2}
+
+
+def test_final_transaction_removes_late_sessions_before_the_viewers(recording_cursor, recording_connection):
+    cursor = recording_cursor()
+    api.Client(conn=recording_connection(cursor)).delete_viewers([7, 8], batch_size=100)
+    final = [sql for sql in cursor.statements if "LIMIT" not in sql]
+    assert [sql.split(" WHERE")[0] for sql in final[1:]] == [
+        "DELETE FROM sessions", "DELETE FROM viewers", "DELETE FROM users"]
+    assert final[1] == "DELETE FROM sessions WHERE uid IN (%s, %s)"
@@ -0,0 +1,28 @@
+import api
+import project
+
+
+def test_missing_rollups_are_built_once_before_the_insert(monkeypatch, recording_cursor, recording_connection):
+    monkeypatch.setattr(project, "rollups_ready", False)
+    cursor = recording_cursor(results={"SHOW TABLES LIKE": lambda params: [] if params == ("release_stats",) else [params]})
+    conn = recording_connection(cursor)
+    client = api.Client(conn=conn)
+    client.insert_session(1, 2, 3, 1, "2024-01-01 10:00:00", "2024-01-01 11:00:00", "HD", "tv")
+    client.insert_session(4, 2, 3, 1, "2024-01-02 10:00:00", "2024-01-02 11:00:00", "HD", "tv")
+
+    assert [sql for sql in cursor.statements if sql.startswith("SHOW TABLES")] == ["SHOW TABLES LIKE %s"] * 2
+    creates = [sql for sql in cursor.statements if sql.lstrip().startswith("CREATE TABLE")]
+    assert len(creates) == 1 and "release_stats" in creates[0]
+    assert cursor.statements.index(creates[0]) < cursor.statements.index(project.INSERT_SESSION_SQL)
+    assert project.BUILD_RELEASE_STATS_SQL in cursor.statements
+    assert project.BUILD_VIEWER_DAILY_SESSIONS_SQL not in cursor.statements
+    assert conn.commits == 3
+
+
+def test_present_rollups_are_left_alone(monkeypatch, recording_cursor, recording_connection):
+    monkeypatch.setattr(project, "rollups_ready", False)
+    cursor = recording_cursor(results={"SHOW TABLES LIKE": lambda params: [params]})
+    api.Client(conn=recording_connection(cursor)).popular_release(5)
+    assert project.rollups_ready
+    assert not [sql for sql in cursor.statements if "CREATE TABLE" in sql or sql in
+                (project.BUILD_RELEASE_STATS_SQL, project.BUILD_VIEWER_DAILY_SESSIONS_SQL)]
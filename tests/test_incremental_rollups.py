@@ -0,0 +1,120 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+import project
+
+
+class SqliteCursor:
+    """
+    Runs the project's %s-style SQL on sqlite, with dates passed as ISO strings.
+    """
+
+    def __init__(self, conn):
+        self.cursor = conn.cursor()
+        self.statements = []
+
+    def execute(self, sql, params=()):
+        self.statements.append(sql)
+        params = [value.isoformat() if isinstance(value, date) else value for value in params]
+        self.cursor.execute(sql.replace("%s", "?"), params)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+
+def rollups(conn):
+    return (sorted(conn.execute("SELECT rid, review_count FROM release_stats").fetchall()),
+            sorted(conn.execute("SELECT day, uid, session_count FROM viewer_daily_sessions").fetchall()))
+
+
+@pytest.fixture
+def db():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript("""
+        CREATE TABLE releases (rid INTEGER PRIMARY KEY);
+        CREATE TABLE reviews (rvid INTEGER PRIMARY KEY, uid INTEGER, rid INTEGER);
+        CREATE TABLE sessions (sid INTEGER PRIMARY KEY, uid INTEGER, rid INTEGER, initiate_at TEXT);
+        CREATE TABLE release_stats (rid INTEGER PRIMARY KEY, review_count INTEGER);
+        CREATE TABLE viewer_daily_sessions (day TEXT, uid INTEGER, session_count INTEGER, PRIMARY KEY (day, uid));
+    """)
+    conn.executemany("INSERT INTO releases VALUES (?)", [(rid,) for rid in range(1, 6)])
+    conn.executemany("INSERT INTO reviews VALUES (?, ?, ?)",
+                     [(rvid, rvid % 3 + 1, rvid % 5 + 1) for rvid in range(1, 31)])
+    conn.executemany("INSERT INTO sessions VALUES (?, ?, ?, ?)",
+                     [(sid, sid % 4 + 1, sid % 5 + 1, f"2024-01-{sid % 6 + 1:02d} {sid % 24:02d}:00:00")
+                      for sid in range(1, 61)])
+    conn.execute(project.BUILD_RELEASE_STATS_SQL)
+    conn.execute(project.BUILD_VIEWER_DAILY_SESSIONS_SQL)
+    yield conn
+    conn.close()
+
+
+def write(path, header, rows):
+    path.write_text("\n".join([header] + [",".join(map(str, row)) for row in rows]) + "\n")
+    return str(path)
+
+
+def test_recounting_the_changed_keys_matches_a_full_rebuild(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(project, "normalized_genres", False)
+    cursor = SqliteCursor(db)
+    review_header = "rvid,uid,rid,rating,comment,posted_at"
+    session_header = "sid,uid,rid,ep_num,initiate_at,leave_at,quality,device"
+    delete_paths = {"sessions": write(tmp_path / "sessions.deletes.csv", "sid", [[7], [8]]),
+                    "reviews": write(tmp_path / "reviews.deletes.csv", "rvid", [[3]])}
+    # Review 1 moves from release 2 to 4, review 99 is new, session 5 moves to another day, session 99 is new.
+    upsert_paths = {"releases": write(tmp_path / "releases.csv", "rid,producer_uid,title,genre,release_date",
+                                      [[6, "", "New", "", ""]]),
+                    "reviews": write(tmp_path / "reviews.csv", review_header, [[1, 2, 4, 3.0, "", ""],
+                                                                               [99, 1, 6, 4.0, "", ""]]),
+                    "sessions": write(tmp_path / "sessions.csv", session_header,
+                                      [[5, 2, 1, 1, "2024-02-01 10:00:00", "", "", ""],
+                                       [99, 3, 1, 1, "2024-01-03 23:59:59", "", "", ""]])}
+
+    delete_keys = project.rollup_keys(cursor, delete_paths, {})
+    db.execute("DELETE FROM sessions WHERE sid IN (7, 8)")
+    db.execute("DELETE FROM reviews WHERE rvid = 3")
+    project.refresh_rollups(cursor, delete_keys)
+
+    upsert_keys = project.rollup_keys(cursor, {}, upsert_paths)
+    db.execute("INSERT INTO releases VALUES (6)")
+    db.execute("REPLACE INTO reviews VALUES (1, 2, 4)")
+    db.execute("INSERT INTO reviews VALUES (99, 1, 6)")
+    db.execute("REPLACE INTO sessions VALUES (5, 2, 1, '2024-02-01 10:00:00')")
+    db.execute("INSERT INTO sessions VALUES (99, 3, 1, '2024-01-03 23:59:59')")
+    project.refresh_rollups(cursor, upsert_keys)
+
+    assert delete_keys["rid"] == {4}
+    assert delete_keys["day_uid"] == {(date(2024, 1, 2), 4), (date(2024, 1, 3), 1)}
+    assert upsert_keys["rid"] == {2, 4, 6}
+    assert upsert_keys["day_uid"] == {(date(2024, 1, 6), 2), (date(2024, 2, 1), 2), (date(2024, 1, 3), 3)}
+    refreshed = rollups(db)
+    db.execute("DELETE FROM release_stats")
+    db.execute("DELETE FROM viewer_daily_sessions")
+    db.execute(project.BUILD_RELEASE_STATS_SQL)
+    db.execute(project.BUILD_VIEWER_DAILY_SESSIONS_SQL)
+    assert refreshed == rollups(db)
+    assert all(" IN (" in sql for sql in cursor.statements)
+
+
+def test_deleted_parents_recount_what_cascades_from_them(db, tmp_path):
+    cursor = SqliteCursor(db)
+    keys = project.rollup_keys(cursor, {"releases": write(tmp_path / "releases.deletes.csv", "rid", [[2]]),
+                                        "viewers": write(tmp_path / "viewers.deletes.csv", "uid", [[1]])}, {})
+    assert keys["rid"] == {rid for (rid,) in db.execute("SELECT DISTINCT rid FROM reviews WHERE uid = 1")}
+    assert keys["day_uid"] == {(date.fromisoformat(day), uid) for day, uid in
+                               db.execute("SELECT DISTINCT DATE(initiate_at), uid FROM sessions WHERE rid = 2")}
+
+
+def test_upserted_users_resync_only_their_genres(tmp_path, monkeypatch, recording_cursor):
+    monkeypatch.setattr(project, "normalized_genres", True)
+    cursor = recording_cursor()
+    keys = project.rollup_keys(cursor, {}, {"users": write(
+        tmp_path / "users.csv", "uid,email,joined_date,nickname,street,city,state,zip,genres",
+        [[4, "a@example.com", "", "", "", "", "", "", "drama"], [2, "b@example.com", "", "", "", "", "", "", ""]])})
+    project.refresh_rollups(cursor, keys)
+    assert keys["uid"] == {2, 4}
+    assert [params for _, params in cursor.executed] == [[2, 4], [2, 4]]
+    assert cursor.statements[0] == "DELETE FROM user_genres WHERE uid IN (%s, %s)"
+    assert "AND uid IN (%s, %s)" in cursor.statements[1]
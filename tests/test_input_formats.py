@@ -0,0 +1,94 @@
+import csv
+
+import pytest
+
+import input_formats
+
+HEADER = ["sid", "comment", "note"]
+ROWS = [
+    ["1", "plain", "x"],
+    ["2", "two\nlines", "y"],
+    ["3", 'she said ""hi""', "z"],
+    ["4", "quoted, with comma", ""],
+    ["5", 'multi\nline "quote"\nand, comma', "w"],
+    ["6", "", '"'],
+] * 9
+
+
+def write_csv(path, rows, header=HEADER, line_terminator="\r\n"):
+    with open(path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile, lineterminator=line_terminator)
+        if header is not None:
+            writer.writerow(header)
+        writer.writerows(rows)
+
+
+def read_whole(path):
+    """
+    (row, line_num) for every record after the header, as a plain csv.reader numbers them.
+    """
+    with open(path, newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader)
+        return [(row, reader.line_num) for row in reader]
+
+
+def read_ranges(path, ranges):
+    records = []
+    for byte_range in ranges:
+        with input_formats.open_rows(str(path), byte_range) as reader:
+            assert next(reader) == HEADER
+            assert reader.line_num == 1
+            records += [(row, reader.line_num) for row in reader]
+    return records
+
+
+@pytest.mark.parametrize("parts", [1, 3, 7, 50])
+@pytest.mark.parametrize("line_terminator", ["\r\n", "\n"])
+def test_ranges_read_back_every_record_once_with_file_line_numbers(tmp_path, parts, line_terminator):
+    path = tmp_path / "sessions.csv"
+    write_csv(path, ROWS, line_terminator=line_terminator)
+    ranges = input_formats.split_csv(str(path), parts)
+    assert 1 <= len(ranges) <= parts
+    assert len(ranges) > 1 or parts == 1
+    assert ranges[0][0] == len(",".join(HEADER) + line_terminator)
+    assert ranges[-1][1] == path.stat().st_size
+    assert all(end == next_start for (_, end, _), (next_start, _, _) in zip(ranges, ranges[1:]))
+    assert read_ranges(path, ranges) == read_whole(path)
+
+
+def test_last_record_without_a_newline(tmp_path):
+    path = tmp_path / "sessions.csv"
+    write_csv(path, ROWS)
+    path.write_bytes(path.read_bytes().rstrip(b"\r\n"))
+    assert read_ranges(path, input_formats.split_csv(str(path), 7)) == read_whole(path)
+
+
+def test_empty_file_has_no_ranges(tmp_path):
+    path = tmp_path / "sessions.csv"
+    path.write_bytes(b"")
+    assert input_formats.split_csv(str(path), 4) == []
+
+
+@pytest.mark.parametrize("header", [b"sid,comment,note\r\n", b"sid,comment,note"])
+def test_header_only_file_has_no_ranges(tmp_path, header):
+    path = tmp_path / "sessions.csv"
+    path.write_bytes(header)
+    assert input_formats.split_csv(str(path), 4) == []
+
+
+def test_bare_quote_in_an_unquoted_field_does_not_move_the_cuts(tmp_path):
+    path = tmp_path / "sessions.csv"
+    rows = [[str(sid), "plain", "x"] for sid in range(1, 41)]
+    rows[5][1] = '12" screen'
+    rows[20][1] = "two\nlines"
+    with open(path, 'w', newline='') as csvfile:
+        csvfile.write("sid,comment,note\r\n")
+        for row in rows:
+            # csv.writer would quote the inch mark; files written by hand often do not.
+            comment = row[1] if "\n" not in row[1] else '"' + row[1] + '"'
+            csvfile.write(f"{row[0]},{comment},{row[2]}\r\n")
+    whole = read_whole(path)
+    assert [row for row, _ in whole] == rows
+    for parts in range(1, 60):
+        assert read_ranges(path, input_formats.split_csv(str(path), parts)) == whole
@@ -0,0 +1,45 @@
+import pytest
+
+import project
+
+BACKSLASH_ROWS = [
+    ("1", "C:\\new"),
+    ("2", "\\N"),
+    ("3", "ends with \\"),
+    ("4", '"quoted\\", then more'),
+]
+
+
+def write_csv(path):
+    import csv
+    with open(path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["id", "path"])
+        writer.writerows(BACKSLASH_ROWS)
+
+
+def test_load_infile_turns_off_backslash_escapes(tmp_path, recording_cursor):
+    csv_path = tmp_path / "paths.csv"
+    write_csv(csv_path)
+    cursor = recording_cursor(results={"SHOW COLUMNS": [("id",), ("path",)], "WARNINGS": [(0,)]})
+    project.load_infile(cursor, "paths", str(csv_path))
+    load = next(sql for sql in cursor.statements if "LOAD DATA" in sql)
+    assert "ESCAPED BY ''" in load
+
+
+def test_backslashes_load_the_same_through_both_paths(tmp_path, mysql_conn):
+    cursor = mysql_conn.cursor()
+    if not project.local_infile_enabled(cursor):
+        pytest.skip("server has local_infile off")
+    csv_path = tmp_path / "paths.csv"
+    write_csv(csv_path)
+    for table in ("paths_infile", "paths_rows"):
+        cursor.execute(f"CREATE TEMPORARY TABLE {table} (id INT PRIMARY KEY, path VARCHAR(255))")
+    assert project.load_infile(cursor, "paths_infile", str(csv_path)) == len(BACKSLASH_ROWS)
+    project.load_rows(cursor, "paths_rows", str(csv_path), dict(project.DEFAULT_IMPORT_OPTIONS))
+    loaded = {}
+    for table in ("paths_infile", "paths_rows"):
+        cursor.execute(f"SELECT id, path FROM {table} ORDER BY id")
+        loaded[table] = cursor.fetchall()
+    assert loaded["paths_infile"] == loaded["paths_rows"]
+    assert [path for _, path in loaded["paths_rows"]] == [path for _, path in BACKSLASH_ROWS]
@@ -0,0 +1,158 @@
+import pytest
+
+import project
+import result_cache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 0.001
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def open_cache(request, tmp_path):
+    def open_cache(**options):
+        spec = "memory" if request.param == "memory" else str(tmp_path / "cache.db")
+        return result_cache.open_cache(spec, **options)
+    return open_cache
+
+
+def test_least_recently_used_entry_is_evicted(clock, open_cache):
+    cache = open_cache(max_entries=2)
+    cache.put("a", "1\n", cache.snapshot(["releases"]))
+    cache.put("b", "2\n", cache.snapshot(["releases"]))
+    assert cache.get("a", ["releases"]) == "1\n"
+    cache.put("c", "3\n", cache.snapshot(["releases"]))
+    assert cache.get("b", ["releases"]) is None
+    assert cache.get("a", ["releases"]) == "1\n"
+    assert cache.get("c", ["releases"]) == "3\n"
+
+
+def test_entries_expire_after_the_ttl(clock, open_cache):
+    cache = open_cache(ttl=60)
+    cache.put("a", "1\n", cache.snapshot(["releases"]))
+    clock.now += 59
+    assert cache.get("a", ["releases"]) == "1\n"
+    clock.now += 2
+    assert cache.get("a", ["releases"]) is None
+
+
+def test_writing_a_read_table_invalidates_the_entry(clock, open_cache):
+    cache = open_cache()
+    cache.put("a", "1\n", cache.snapshot(["releases", "reviews"]))
+    cache.invalidate(["movies"])
+    assert cache.get("a", ["releases", "reviews"]) == "1\n"
+    cache.invalidate(["reviews"])
+    assert cache.get("a", ["releases", "reviews"]) is None
+
+
+def test_entry_made_from_a_stale_snapshot_is_not_served(clock, open_cache):
+    cache = open_cache()
+    versions = cache.snapshot(["releases"])
+    cache.invalidate(["releases"])
+    cache.put("a", "1\n", versions)
+    assert cache.get("a", ["releases"]) is None
+
+
+def test_sqlite_versions_are_shared_between_processes(clock, tmp_path):
+    path = str(tmp_path / "cache.db")
+    reader, writer = result_cache.open_cache(path), result_cache.open_cache(path)
+    reader.put("a", "1\n", reader.snapshot(["sessions"]))
+    writer.invalidate(["sessions"])
+    assert reader.get("a", ["sessions"]) is None
+
+
+# Commands that neither read a cached query's tables through the cache nor change any table.
+UNCACHED_COMMANDS = {"repl", "batch", "ensureIndexes", "statementStats", "activeViewer"}
+
+
+def test_every_command_is_classified():
+    assert set(project.CACHED_QUERY_TABLES).isdisjoint(project.WRITE_TABLES)
+    unclassified = set(project.COMMANDS) - set(project.CACHED_QUERY_TABLES) - set(project.WRITE_TABLES)
+    assert unclassified == UNCACHED_COMMANDS
+    assert set(project.CACHED_QUERY_TABLES) | set(project.WRITE_TABLES) <= set(project.COMMANDS)
+
+
+def test_every_cached_table_is_known_and_written_somewhere():
+    written = {table for tables in project.WRITE_TABLES.values() for table in tables}
+    assert written <= set(project.ALL_TABLES)
+    for command, tables in project.CACHED_QUERY_TABLES.items():
+        assert set(tables) <= written, command
+
+
+@pytest.fixture
+def command(monkeypatch):
+    calls = []
+
+    def use(handler):
+        def run(args):
+            calls.append(args)
+            return handler(args)
+        monkeypatch.setitem(project.COMMANDS, "listReleases", run)
+        return calls
+    return use
+
+
+def test_successful_output_is_served_from_the_cache(command, capsys, clock):
+    def succeed(args):
+        print("1,Title,Movie")
+        return True
+    calls = command(succeed)
+    cache = result_cache.MemoryCache()
+    project.run_cached(cache, "listReleases", ["1"])
+    project.run_cached(cache, "listReleases", ["1"])
+    assert len(calls) == 1
+    assert capsys.readouterr().out == "1,Title,Movie\n" * 2
+
+
+def test_failed_command_is_not_cached(command, capsys, clock):
+    def fail(args):
+        print("Fail", "Lost connection")
+        return False
+    calls = command(fail)
+    cache = result_cache.MemoryCache()
+    project.run_cached(cache, "listReleases", ["1"])
+    project.run_cached(cache, "listReleases", ["1"])
+    assert len(calls) == 2
+
+
+def test_empty_output_from_a_failure_is_not_cached(command, clock):
+    calls = command(lambda args: False)
+    cache = result_cache.MemoryCache()
+    project.run_cached(cache, "listReleases", ["1"])
+    project.run_cached(cache, "listReleases", ["1"])
+    assert len(calls) == 2
+
+
+def test_command_that_raises_is_not_cached(command, clock):
+    def explode(args):
+        print("1,Title,Movie")
+        raise ValueError("bad argument")
+    calls = command(explode)
+    cache = result_cache.MemoryCache()
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            project.run_cached(cache, "listReleases", ["1"])
+    assert len(calls) == 2
+    assert not cache.entries
+
+
+def test_list_releases_reports_a_failed_query(monkeypatch, capsys):
+    import api
+
+    def failing(self, uid, stream=False):
+        raise api.CommandFailed("Table 'cs122a.reviews' doesn't exist")
+    monkeypatch.setattr(api.Client, "list_releases", failing)
+    assert project.list_releases(1) is False
+    assert capsys.readouterr().out.startswith("Fail")
@@ -0,0 +1,81 @@
+import pytest
+
+import csv_validation
+import project
+
+
+def test_normal_import_builds_the_same_indexes_fast_import_defers(recording_cursor):
+    cursor = recording_cursor()
+    project.add_secondary_indexes(cursor)
+    alters = dict(sql.split(" ", 3)[2:] for sql in cursor.statements[1:])
+    for table, index_name, columns in project.SECONDARY_INDEXES:
+        addition = f"ADD INDEX {index_name} ({columns})"
+        assert addition in alters[table]
+        assert addition in project.deferred_definition(table)[1]
+
+
+def test_indexes_that_exist_are_not_added_again(recording_cursor):
+    cursor = recording_cursor(results={"information_schema.statistics": [("idx_sessions_initiate_uid",),
+                                                                          ("idx_reviews_uid_rid",)]})
+    project.add_secondary_indexes(cursor)
+    assert cursor.statements[1:] == ["ALTER TABLE sessions ADD INDEX idx_sessions_rid_uid (rid, uid)"]
+
+
+def definition_entries(create_sql):
+    body = create_sql[create_sql.index("(") + 1:create_sql.rindex(")")]
+    if "PARTITION BY" in create_sql:
+        body = create_sql[create_sql.index("(") + 1:create_sql.index("PARTITION BY")].rstrip().rstrip(")")
+    return [line.strip().rstrip(",") for line in body.splitlines() if line.strip()]
+
+
+def all_definitions():
+    definitions = dict(project.TABLE_DEFINITIONS)
+    yield from definitions.items()
+    yield "sessions", project.partitioned_sessions_definition("2024-01")
+
+
+@pytest.mark.parametrize("table, create_sql", list(all_definitions()),
+                         ids=list(project.TABLE_DEFINITIONS) + ["sessions (partitioned)"])
+def test_every_entry_lands_on_exactly_one_side(table, create_sql):
+    bare_sql, alter_sql = project.deferred_definition(table, create_sql)
+    bare_entries = definition_entries(bare_sql)
+    additions = alter_sql[len(f"ALTER TABLE {table} "):] if alter_sql else ""
+    for entry in definition_entries(create_sql):
+        upper = entry.upper()
+        if upper.startswith(("FOREIGN KEY", "KEY ", "INDEX ")):
+            assert "ADD " + entry in additions
+            assert entry not in bare_entries
+        elif " UNIQUE" in upper:
+            column = entry.split()[0]
+            assert f"ADD UNIQUE KEY ({column})" in additions
+            assert entry.replace(" UNIQUE", "") in bare_entries
+        else:
+            assert entry in bare_entries
+    assert not any(" UNIQUE" in entry.upper() or entry.upper().startswith(("FOREIGN KEY", "KEY ", "INDEX "))
+                   for entry in bare_entries)
+    assert csv_validation.column_specs(bare_sql) == csv_validation.column_specs(create_sql)
+    if "PARTITION BY" in create_sql:
+        assert create_sql[create_sql.index("PARTITION BY"):].strip().rstrip(";") in bare_sql
+
+
+def test_users_email_unique_moves_to_the_alter():
+    bare_sql, alter_sql = project.deferred_definition("users")
+    assert "email VARCHAR(255) NOT NULL," in bare_sql
+    assert "UNIQUE" not in bare_sql
+    assert alter_sql == "ALTER TABLE users ADD UNIQUE KEY (email)"
+
+
+def test_composite_primary_key_stays_in_the_bare_table():
+    bare_sql, alter_sql = project.deferred_definition("videos")
+    assert "PRIMARY KEY (rid, ep_num)" in bare_sql
+    assert "PRIMARY KEY" not in alter_sql
+
+
+def test_partitioned_sessions_keeps_its_key_and_partitions_and_defers_its_indexes():
+    bare_sql, alter_sql = project.deferred_definition("sessions", project.partitioned_sessions_definition("2024-01"))
+    assert "PRIMARY KEY (sid, initiate_at)" in bare_sql
+    assert "PARTITION BY RANGE COLUMNS (initiate_at)" in bare_sql
+    assert "KEY idx_sessions_uid" not in bare_sql
+    assert alter_sql == ("ALTER TABLE sessions ADD KEY idx_sessions_uid (uid), ADD KEY idx_sessions_rid_ep (rid, ep_num), "
+                         "ADD INDEX idx_sessions_initiate_uid (initiate_at, uid), ADD INDEX idx_sessions_rid_uid (rid, uid)")
+    assert "FOREIGN KEY" not in alter_sql
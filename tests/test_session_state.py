@@ -0,0 +1,18 @@
+import pytest
+
+import project
+
+
+def test_foreign_key_checks_come_back_on_after_a_failed_statement(recording_cursor):
+    cursor = recording_cursor(fail_on={"DROP TABLE sessions": project.mysql.connector.Error("lost connection")})
+    with pytest.raises(project.mysql.connector.Error):
+        with project.ForeignKeyChecksOff(cursor):
+            cursor.execute("DROP TABLE sessions")
+    assert cursor.statements == ["SET FOREIGN_KEY_CHECKS = 0;", "SET FOREIGN_KEY_CHECKS = 1;"]
+
+
+def test_a_failed_restore_keeps_the_original_error(recording_cursor):
+    cursor = recording_cursor(fail_on={"SET FOREIGN_KEY_CHECKS = 1;": project.mysql.connector.Error("lost connection")})
+    with pytest.raises(ValueError):
+        with project.ForeignKeyChecksOff(cursor):
+            raise ValueError("bad checkpoint")
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+import tracing
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WRITER = """
+import sys
+import tracing
+tracer = tracing.Tracer(sys.argv[1], fmt="prometheus")
+for _ in range(int(sys.argv[2])):
+    tracer.finish(tracer.start("listReleases", ["1"]))
+"""
+
+
+def read_dump(path):
+    with open(path) as dump:
+        return dict(line.rsplit(" ", 1) for line in dump.read().splitlines() if not line.startswith("#"))
+
+
+def test_commands_accumulate_in_the_dump(tmp_path):
+    path = str(tmp_path / "metrics.prom")
+    tracer = tracing.Tracer(path, fmt="prometheus")
+    for command in ["listReleases", "listReleases", "popularRelease"]:
+        tracer.finish(tracer.start(command, []))
+    metrics = read_dump(path)
+    assert metrics['cs122a_commands_total{command="listReleases"}'] == "2"
+    assert metrics['cs122a_commands_total{command="popularRelease"}'] == "1"
+
+
+def test_concurrent_processes_do_not_lose_counts(tmp_path):
+    path = str(tmp_path / "metrics.prom")
+    writers = [subprocess.Popen([sys.executable, "-c", WRITER, path, "50"], cwd=REPO_ROOT) for _ in range(4)]
+    assert [writer.wait() for writer in writers] == [0] * 4
+    assert read_dump(path)['cs122a_commands_total{command="listReleases"}'] == "200"
@@ -0,0 +1,16 @@
+import project
+
+USER_COLUMNS = ["uid", "email", "joined_date", "nickname", "street", "city", "state", "zip", "genres"]
+
+
+def test_upsert_leaves_the_primary_key_alone(tmp_path, recording_cursor):
+    csv_path = tmp_path / "users.csv"
+    csv_path.write_text(",".join(USER_COLUMNS) + "\n1,a@example.com,2024-01-01,,,,,,\n")
+    cursor = recording_cursor(results={"SHOW COLUMNS": [(column,) for column in USER_COLUMNS]})
+    options = dict(project.DEFAULT_IMPORT_OPTIONS, upsert=True)
+    assert project.load_rows(cursor, "users", str(csv_path), options) == 1
+    (sql, rows), = [(sql, params) for sql, params in cursor.executed if sql.startswith("INSERT")]
+    updates = sql.split("ON DUPLICATE KEY UPDATE", 1)[1]
+    assert "`uid`" not in updates
+    assert "`email` = VALUES(`email`)" in updates
+    assert rows == [["1", "a@example.com", "2024-01-01", None, None, None, None, None, None]]
@@ -0,0 +1,232 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+class Tracer:
+    """
+    Records one trace per command: connect time, every statement's SQL, duration and rows, and output time.
+    Traces are appended to a JSON-lines file, or merged into a Prometheus text dump when fmt is "prometheus".
+    Statements slower than slow_ms are also logged to stderr.
+    """
+
+    def __init__(self, path, fmt="jsonl", slow_ms=None):
+        self.path = path
+        self.fmt = fmt
+        self.slow_ms = slow_ms
+        self.lock = threading.Lock()
+        self.stack = []
+
+    @property
+    def active(self):
+        """
+        The innermost running command; repl and batch nest their commands inside their own trace.
+        Import worker threads report into the import's trace.
+        """
+        return self.stack[-1] if self.stack else None
+
+    def start(self, command, args):
+        trace = CommandTrace(self, command, args)
+        self.stack.append(trace)
+        trace.stdout = sys.stdout
+        sys.stdout = TimedWriter(sys.stdout, trace)
+        return trace
+
+    def finish(self, trace):
+        sys.stdout = trace.stdout
+        self.stack.remove(trace)
+        trace.total_seconds = time.perf_counter() - trace.started
+        if self.path is None:
+            return
+        with self.lock:
+            if self.fmt == "prometheus":
+                self.write_prometheus(trace)
+            else:
+                with open(self.path, 'a') as trace_file:
+                    trace_file.write(json.dumps(trace.record()) + "\n")
+
+    def slow_statement(self, trace, statement):
+        if self.slow_ms is not None and statement["execute_ms"] >= self.slow_ms:
+            print(f"slow query ({statement['execute_ms']:.1f} ms) in {trace.command}: {statement['sql']}",
+                  file=sys.stderr)
+
+    def write_prometheus(self, trace):
+        """
+        Adds this command's numbers to the counters already in the dump, so separate CLI calls accumulate.
+        The read-add-rewrite holds an flock on "<path>.lock", since other CLI processes share the dump, and the
+        new dump replaces the old one whole, so a reader never sees it half written.
+        """
+        import fcntl
+        with open(self.path + ".lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.merge_prometheus(trace)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def merge_prometheus(self, trace):
+        metrics = {}
+        if os.path.exists(self.path):
+            with open(self.path) as dump:
+                for line in dump:
+                    if line.strip() and not line.startswith("#"):
+                        name, value = line.rsplit(" ", 1)
+                        metrics[name] = float(value)
+        label = '{command="%s"}' % trace.command
+        record = trace.record()
+        increments = {
+            "cs122a_commands_total": 1,
+            "cs122a_command_seconds_total": record["total_ms"] / 1000,
+            "cs122a_connect_seconds_total": record["connect_ms"] / 1000,
+            "cs122a_statements_total": len(record["statements"]),
+            "cs122a_statement_seconds_total": sum(s["execute_ms"] + s["fetch_ms"] for s in record["statements"]) / 1000,
+            "cs122a_rows_total": record["rows"],
+            "cs122a_output_seconds_total": record["output_ms"] / 1000,
+        }
+        for name, value in increments.items():
+            metrics[name + label] = metrics.get(name + label, 0) + value
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, 'w') as dump:
+            for family in sorted({key.split("{")[0] for key in metrics}):
+                dump.write(f"# TYPE {family} counter\n")
+                for key in sorted(key for key in metrics if key.split("{")[0] == family):
+                    dump.write(f"{key} {metrics[key]:g}\n")
+        os.replace(temporary_path, self.path)
+
+class CommandTrace:
+    def __init__(self, tracer, command, args):
+        self.tracer = tracer
+        self.command = command
+        self.args = args
+        self.timestamp = datetime.now().isoformat(timespec="milliseconds")
+        self.started = time.perf_counter()
+        self.total_seconds = None
+        self.connect_seconds = 0.0
+        self.connections = 0
+        self.output_seconds = 0.0
+        self.statements = []
+
+    def connect(self, open_connection, **options):
+        started = time.perf_counter()
+        conn = open_connection(**options)
+        self.connect_seconds += time.perf_counter() - started
+        self.connections += 1
+        return TracedConnection(conn, self)
+
+    def add_statement(self, sql, seconds, rowcount):
+        statement = {
+            "sql": re.sub(r"\s+", " ", sql).strip(),
+            "execute_ms": round(seconds * 1000, 3),
+            "fetch_ms": 0.0,
+            "rows": 0,
+            "rowcount": rowcount,
+        }
+        self.statements.append(statement)
+        self.tracer.slow_statement(self, statement)
+        return statement
+
+    def record(self):
+        total_seconds = self.total_seconds if self.total_seconds is not None else time.perf_counter() - self.started
+        return {
+            "ts": self.timestamp,
+            "command": self.command,
+            "args": self.args,
+            "total_ms": round(total_seconds * 1000, 3),
+            "connect_ms": round(self.connect_seconds * 1000, 3),
+            "connections": self.connections,
+            "statements": self.statements,
+            "rows": sum(statement["rows"] for statement in self.statements),
+            "output_ms": round(self.output_seconds * 1000, 3),
+        }
+
+class TracedConnection:
+    def __init__(self, conn, trace):
+        self.conn = conn
+        self.trace = trace
+
+    def cursor(self, *args, **kwargs):
+        return TracedCursor(self.conn.cursor(*args, **kwargs), self.trace)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+class TracedCursor:
+    def __init__(self, cursor, trace):
+        self.cursor = cursor
+        self.trace = trace
+        self.statement = None
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self.cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            self.statement = self.trace.add_statement(operation, time.perf_counter() - started,
+                                                      self.cursor.rowcount)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self.cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            self.statement = self.trace.add_statement(operation, time.perf_counter() - started,
+                                                      self.cursor.rowcount)
+
+    def fetched(self, started, rows):
+        if self.statement is not None:
+            self.statement["fetch_ms"] = round(self.statement["fetch_ms"] + (time.perf_counter() - started) * 1000, 3)
+            self.statement["rows"] += rows
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self.cursor.fetchone()
+        self.fetched(started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=1):
+        started = time.perf_counter()
+        rows = self.cursor.fetchmany(size)
+        self.fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self.cursor.fetchall()
+        self.fetched(started, len(rows))
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+class TimedWriter:
+    def __init__(self, stream, trace):
+        self.stream = stream
+        self.trace = trace
+
+    def write(self, text):
+        started = time.perf_counter()
+        try:
+            return self.stream.write(text)
+        finally:
+            self.trace.output_seconds += time.perf_counter() - started
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+def tracer_from_env(environ=os.environ):
+    """
+    CS122A_TRACE names the trace file, CS122A_TRACE_FORMAT picks "jsonl" (default) or "prometheus",
+    and CS122A_SLOW_MS sets the slow-statement threshold. Returns None when none of them is set.
+    """
+    path = environ.get("CS122A_TRACE")
+    slow_ms = environ.get("CS122A_SLOW_MS")
+    if not path and not slow_ms:
+        return None
+    return Tracer(path or None, environ.get("CS122A_TRACE_FORMAT", "jsonl"),
+                  float(slow_ms) if slow_ms else None)